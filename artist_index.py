@@ -0,0 +1,180 @@
+"""Prebuilt artist lookup index for fuzzy singer matching.
+
+``find_closest_singer`` originally ran ``fuzzywuzzy.process.extractOne`` over
+every artist on each search. ``ArtistIndex`` is built once per catalog and
+resolves a query in three steps:
+
+1. exact match on the normalized name (the string fuzzywuzzy scores after
+   its own processing), which always scores 100
+2. a character trigram inverted index that narrows the artists to the
+   ``max_candidates`` sharing the most trigrams with the query, plus every
+   artist tied with the last of them, so the cut never depends on
+   partition order
+3. fuzzy scoring of those candidates with a pluggable scorer backend, keeping
+   the first best match in catalog order at or above ``score_cutoff``
+
+Artist names are indexed with padded trigrams, but a query is looked up with
+its unpadded ones. A single word or a fragment of a name scores the same
+partial ratio against every artist containing it, wherever it appears, and
+``extractOne`` keeps the first of those in catalog order; counting the
+padding would rank artists whose words start or end with the query first and
+could leave that one out.
+
+The scorer is fuzzywuzzy's WRatio, as in ``extractOne``, unless
+``ARTIST_SCORER=rapidfuzz``. rapidfuzz is several times faster but returns
+unrounded scores, so it breaks near ties differently and picks another
+artist for about one single-word or partial query in a hundred.
+
+With ``max_candidates=None`` every artist is scored, which matches
+``extractOne`` exactly; the default trades that for bounded lookup cost, so a
+match that shares almost no trigrams with the query can be missed.
+
+Resolved inputs are remembered in ``result_cache.singer_cache`` under the
+index's fingerprint, so repeated (mis)spellings skip all three steps.
+"""
+import copy
+import hashlib
+import os
+
+import numpy as np
+from fuzzywuzzy import fuzz, utils
+
+from result_cache import singer_cache
+
+SCORE_CUTOFF = 60
+MAX_CANDIDATES = 32
+NGRAM = 3
+
+
+def _fuzzywuzzy_scores(query, choices):
+    """Score with fuzzywuzzy's WRatio, as ``process.extractOne`` does"""
+    return [fuzz.WRatio(query, choice, full_process=False) for choice in choices]
+
+
+def _rapidfuzz_scores(query, choices):
+    """Score with rapidfuzz's WRatio, a faster near drop-in for fuzzywuzzy"""
+    from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process
+    return rapid_process.cdist([query], choices, scorer=rapid_fuzz.WRatio)[0]
+
+
+SCORER_BACKENDS = {
+    'fuzzywuzzy': _fuzzywuzzy_scores,
+    'rapidfuzz': _rapidfuzz_scores,
+}
+DEFAULT_SCORER = os.environ.get('ARTIST_SCORER', 'fuzzywuzzy')
+
+
+def normalize_name(name):
+    """Normalize an artist name the way fuzzywuzzy scores a choice"""
+    return utils.full_process(name, force_ascii=True)
+
+
+def normalize_query(query):
+    """Normalize a query the way fuzzywuzzy scores it"""
+    return utils.full_process(utils.full_process(query), force_ascii=True)
+
+
+def name_ngrams(text, n=NGRAM):
+    """Distinct padded character n-grams of a normalized string"""
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+def query_ngrams(text, n=NGRAM):
+    """Distinct unpadded character n-grams of a normalized query, or its padded ones if it is shorter than n"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)} or name_ngrams(text, n)
+
+
+class ArtistIndex:
+    """Exact, n-gram and fuzzy lookup over a catalog's artist names"""
+
+    def __init__(self, artists, scorer=DEFAULT_SCORER, max_candidates=MAX_CANDIDATES):
+        self.scorer = scorer
+        self.max_candidates = max_candidates
+        self.artists = []
+        self.normalized = []
+        self._exact = {}
+        self._postings = {}
+        self._add(artists)
+
+    def _add(self, artists):
+        """Append artists after the indexed ones"""
+        start = len(self.artists)
+        # Catalog order decides ties, like extractOne over df['artist_name'].unique()
+        self.artists.extend(artist for artist in artists if artist.strip())
+        self.normalized.extend(normalize_name(artist) for artist in self.artists[start:])
+
+        postings = {}
+        for position, name in enumerate(self.normalized[start:], start):
+            if not name:
+                # fuzzywuzzy scores empty names 0, so they can never match
+                continue
+            self._exact.setdefault(name, position)
+            for gram in name_ngrams(name):
+                postings.setdefault(gram, []).append(position)
+        for gram, rows in postings.items():
+            rows = np.asarray(rows, dtype=np.int32)
+            if gram in self._postings:
+                rows = np.concatenate([self._postings[gram], rows])
+            self._postings[gram] = rows
+        # Identifies the artist list for cached lookups
+        self.fingerprint = hashlib.sha1('\x00'.join(self.artists).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_dataframe(cls, df, **kwargs):
+        """Build the index from a catalog's ``artist_name`` column"""
+        return cls(df['artist_name'].unique().tolist(), **kwargs)
+
+    def extended(self, artists):
+        """Copy of the index with the artists it does not know yet appended"""
+        index = copy.copy(self)
+        index.artists = list(self.artists)
+        index.normalized = list(self.normalized)
+        index._exact = dict(self._exact)
+        index._postings = dict(self._postings)
+        known = set(self.artists)
+        index._add([artist for artist in dict.fromkeys(artists) if artist not in known])
+        return index
+
+    def candidates(self, query):
+        """Positions of the artists sharing the most n-grams with a normalized query, in catalog order
+
+        Artists tied with the last of the ``max_candidates`` best are all kept.
+        """
+        if self.max_candidates is None:
+            return np.arange(len(self.artists))
+        postings = [self._postings[gram] for gram in query_ngrams(query) if gram in self._postings]
+        if not postings:
+            return np.array([], dtype=np.int64)
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.artists))
+        matched = np.flatnonzero(shared)
+        if len(matched) > self.max_candidates:
+            cut = len(matched) - self.max_candidates
+            cutoff = np.partition(shared[matched], cut)[cut]
+            matched = matched[shared[matched] >= cutoff]
+        return matched
+
+    def lookup(self, user_input, score_cutoff=SCORE_CUTOFF):
+        """Return the best matching artist name, or None below ``score_cutoff``"""
+        key = (self.fingerprint, self.scorer, self.max_candidates, score_cutoff, user_input)
+        return singer_cache.get_or_compute(key, lambda: self._lookup(user_input, score_cutoff))
+
+    def _lookup(self, user_input, score_cutoff):
+        query = normalize_query(user_input)
+        if not query:
+            return None
+
+        position = self._exact.get(query)
+        if position is not None:
+            return self.artists[position]
+
+        candidates = self.candidates(query)
+        if len(candidates) == 0:
+            return None
+        score = SCORER_BACKENDS[self.scorer] if isinstance(self.scorer, str) else self.scorer
+        scores = np.asarray(score(query, [self.normalized[i] for i in candidates]))
+        # argmax keeps the first of equal scores, like max() in extractOne
+        best = int(np.argmax(scores))
+        if scores[best] < score_cutoff:
+            return None
+        return self.artists[candidates[best]]
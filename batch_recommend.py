@@ -0,0 +1,193 @@
+"""Batch recommendations for many singers at once.
+
+``recommend_batch`` takes a list of ``(singer, genre_filter, num_recommendations)``
+queries, resolves every singer, groups the queries by matched artist and genre
+filter, and scores each group with a single sparse matrix product against the
+prebuilt recommendation index. Groups can be spread over a thread or process
+pool. Results match ``get_recommendations`` with the same index.
+
+Command line usage::
+
+    python batch_recommend.py songs.csv --queries queries.csv --output recs.jsonl
+    python batch_recommend.py catalog_bundle/ --all-artists -n 20 --output recs.csv --workers 8
+
+The queries CSV needs a ``singer`` column and may add ``genre`` and ``n``.
+"""
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from catalog import open_catalog
+from ranking import top_k_sparse
+from recommendation_index import SCORING_MODES, artist_key
+from recommender import check_genre_filter, display_songs
+
+DEFAULT_RECOMMENDATIONS = 10
+EXECUTORS = ('thread', 'process')
+
+_worker_catalog = None
+
+
+def _score_group(catalog, scoring, matched_singer, genre_filter, items):
+    """Score the queries of one (artist, genre) group; returns (query id, positions, scores)"""
+    df = catalog.df
+    positions = catalog.index.artist_rows(matched_singer)
+    row_mask = df['genre'].iloc[positions].to_numpy() == genre_filter if genre_filter else None
+    queries = [f"{singer} {user_input}" for _, user_input, singer, _ in items]
+    positions, similarity = catalog.index.score_many(queries, matched_singer, row_mask, scoring,
+                                                     dense_output=False, k=max(item[3] for item in items))
+
+    scored = []
+    for row_number, (query_id, _, _, num_recommendations) in enumerate(items):
+        row = similarity[row_number]
+        top = top_k_sparse(row, num_recommendations)
+        scored.append((query_id, positions[top], row[:, top].toarray().ravel()))
+    return scored
+
+
+def _init_worker(catalog):
+    global _worker_catalog
+    _worker_catalog = catalog
+
+
+def _score_group_in_worker(args):
+    return _score_group(_worker_catalog, *args)
+
+
+def recommend_batch(queries, catalog, scoring='exact', workers=1, executor='thread'):
+    """Recommend songs for many ``(singer, genre_filter, num_recommendations)`` queries
+
+    Returns one dict per query, in order, with the matched singer, an error
+    message or None, and the recommendations as a dataframe with a ``score``
+    column.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}'. Use one of: {', '.join(EXECUTORS)}")
+
+    df = catalog.df
+    results = []
+    groups = {}
+
+    for query_id, (user_input, genre_filter, num_recommendations) in enumerate(queries):
+        genre_filter = genre_filter or None
+        result = {
+            'query': user_input,
+            'genre_filter': genre_filter,
+            'num_recommendations': num_recommendations,
+            'matched_singer': None,
+            'error': None,
+            'recommendations': pd.DataFrame(),
+        }
+        results.append(result)
+
+        matched_singer = catalog.artist_index.lookup(user_input)
+        if not matched_singer:
+            result['error'] = "No close matches found for the singer. Please check your input."
+            continue
+        result['matched_singer'] = matched_singer
+
+        genre_counts = catalog.row_index.genre_counts(matched_singer)
+        if not genre_counts:
+            result['error'] = f"No genres found for singer '{matched_singer}'."
+            continue
+
+        result['error'] = check_genre_filter(matched_singer, genre_counts, genre_filter, catalog.row_index.genres)
+        if not result['error']:
+            groups.setdefault((artist_key(matched_singer), genre_filter), []).append(
+                (query_id, user_input, matched_singer, num_recommendations)
+            )
+
+    # Queries in a group share the artist's rows, so any of their matched names selects them
+    tasks = [(scoring, items[0][2], genre_filter, items) for (_, genre_filter), items in groups.items()]
+
+    if workers > 1 and len(tasks) > 1:
+        if executor == 'process':
+            chunksize = max(1, len(tasks) // (workers * 4))
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(catalog,)) as pool:
+                scored_groups = list(pool.map(_score_group_in_worker, tasks, chunksize=chunksize))
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                scored_groups = list(pool.map(lambda task: _score_group(catalog, *task), tasks))
+    else:
+        scored_groups = [_score_group(catalog, *task) for task in tasks]
+
+    for scored in scored_groups:
+        for query_id, positions, scores in scored:
+            recommendations = display_songs(df.iloc[positions])
+            recommendations['score'] = scores
+            results[query_id]['recommendations'] = recommendations
+    return results
+
+
+def read_queries(path, default_recommendations=DEFAULT_RECOMMENDATIONS):
+    """Read ``(singer, genre_filter, num_recommendations)`` queries from a CSV"""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        if 'singer' not in (reader.fieldnames or []):
+            raise ValueError(f"{path} needs a 'singer' column")
+        return [(row['singer'], row.get('genre') or None, int(row.get('n') or default_recommendations))
+                for row in reader]
+
+
+def _result_rows(result):
+    base = {key: result[key] for key in ('query', 'genre_filter', 'matched_singer', 'error')}
+    if result['recommendations'].empty:
+        yield base
+        return
+    for rank, song in enumerate(result['recommendations'].to_dict('records'), start=1):
+        yield {**base, 'rank': rank, **song}
+
+
+def write_results(results, path, output_format=None):
+    """Write batch results as JSON lines (one query per line) or CSV (one song per row)"""
+    output_format = output_format or ('csv' if path.endswith('.csv') else 'jsonl')
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if output_format == 'jsonl':
+            for result in results:
+                record = {key: result[key] for key in ('query', 'genre_filter', 'matched_singer', 'error')}
+                record['recommendations'] = result['recommendations'].to_dict('records')
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            return
+
+        song_columns = next((list(result['recommendations'].columns) for result in results
+                             if not result['recommendations'].empty), [])
+        writer = csv.DictWriter(f, fieldnames=['query', 'genre_filter', 'matched_singer', 'error', 'rank',
+                                               *song_columns])
+        writer.writeheader()
+        for result in results:
+            writer.writerows(_result_rows(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute song recommendations for many singers')
+    parser.add_argument('catalog', help='CSV export or catalog bundle directory')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--queries', help="CSV with a 'singer' column and optional 'genre' and 'n' columns")
+    source.add_argument('--all-artists', action='store_true', help='recommend for every artist in the catalog')
+    parser.add_argument('-n', '--num-recommendations', type=int, default=DEFAULT_RECOMMENDATIONS)
+    parser.add_argument('--genre', help='genre filter applied to --all-artists queries')
+    parser.add_argument('--scoring', default='exact', choices=SCORING_MODES)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--executor', default='thread', choices=EXECUTORS)
+    parser.add_argument('--output', required=True, help='.jsonl or .csv file')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='defaults to the output file extension')
+    args = parser.parse_args()
+
+    catalog = open_catalog(args.catalog)
+    if args.all_artists:
+        queries = [(artist, args.genre, args.num_recommendations) for artist in catalog.artist_index.artists]
+    else:
+        queries = read_queries(args.queries, args.num_recommendations)
+
+    results = recommend_batch(queries, catalog, args.scoring, args.workers, args.executor)
+    write_results(results, args.output, args.format)
+    failed = sum(1 for result in results if result['error'])
+    print(f"Wrote recommendations for {len(results) - failed} of {len(results)} queries to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compare ``ArtistIndex.lookup`` with a full ``process.extractOne`` scan.
+
+Builds a synthetic artist list and queries it with exact names, case changes,
+typos and prefixes, and with single words, name fragments and reversed word
+orders. Reports lookup latency for both query sets and how often the indexed
+lookup agrees with the full scan on each. With the fuzzywuzzy scorer any
+disagreement fails the run; rapidfuzz is expected to differ on near ties.
+
+    python benchmarks/bench_artist_index.py --artists 80000 --full-scan-queries 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from fuzzywuzzy import process
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artist_index import DEFAULT_SCORER, SCORE_CUTOFF, ArtistIndex  # noqa: E402
+from synthetic_catalog import make_artists, make_partial_queries, make_queries  # noqa: E402
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--artists', type=int, default=80_000)
+    parser.add_argument('--queries', type=int, default=200, help='queries per set')
+    parser.add_argument('--full-scan-queries', type=int, default=10,
+                        help='queries per set also run through the slow full extractOne scan')
+    parser.add_argument('--scorer', default=DEFAULT_SCORER, help='fuzzywuzzy or rapidfuzz')
+    args = parser.parse_args()
+
+    artists = make_artists(args.artists)
+    query_sets = {
+        'names': make_queries(artists, args.queries),
+        'partial': make_partial_queries(artists, args.queries),
+    }
+
+    start = time.perf_counter()
+    index = ArtistIndex(artists, scorer=args.scorer)
+    build = time.perf_counter() - start
+    print(f"artists: {args.artists}, scorer: {args.scorer}, build: {build:.2f}s")
+
+    disagreements = 0
+    for label, queries in query_sets.items():
+        latencies = []
+        results = []
+        for query in queries:
+            start = time.perf_counter()
+            results.append(index.lookup(query))
+            latencies.append(time.perf_counter() - start)
+        print(f"{label:<8} ArtistIndex.lookup: p50 {percentile_ms(latencies, 50):.2f}ms, "
+              f"p99 {percentile_ms(latencies, 99):.2f}ms")
+
+        full_scan = []
+        agreed = 0
+        for query, result in zip(queries[:args.full_scan_queries], results):
+            start = time.perf_counter()
+            match = process.extractOne(query, artists, score_cutoff=SCORE_CUTOFF)
+            full_scan.append(time.perf_counter() - start)
+            expected = match[0] if match else None
+            if expected == result:
+                agreed += 1
+            else:
+                print(f"         {query!r}: index {result!r}, scan {expected!r}")
+        if full_scan:
+            print(f"{label:<8} extractOne scan:    p50 {percentile_ms(full_scan, 50):.2f}ms, "
+                  f"agreement {agreed}/{len(full_scan)}")
+            disagreements += len(full_scan) - agreed
+
+    if disagreements and args.scorer == 'fuzzywuzzy':
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Check and time the vectorized column selection and value normalization.
+
+Compares ``select_columns`` and ``normalize_values`` with the implementation
+they replaced, which renamed columns one at a time, filled missing text column
+by column and parsed Spotify URIs with a Python lambda per row. Both run on a
+synthetic raw export, on a copy with edge cases mixed in (missing values,
+album and web URIs, URIs with extra colons or line breaks) and on small
+hand-written frames (object columns, non-string URIs, empty frames); their
+outputs must be identical, values and dtypes, or the run fails. Then both are
+timed on the export with and without the edge cases.
+
+    python benchmarks/bench_normalize.py --tracks 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_ingest import COLUMN_MAPPING, REQUIRED_COLUMNS, TEXT_COLUMNS  # noqa: E402
+from catalog_ingest import normalize_values, select_columns  # noqa: E402
+from synthetic_catalog import make_catalog  # noqa: E402
+
+EDGE_URIS = [np.nan, '', 'spotify:album:4aawyAB9vmqN3uQ7FjRGTy', 'https://open.spotify.com/track/abc',
+             'spotify:track:', 'spotify:track:a:b', 'spotify:local:x:spotify:track:y', 'SPOTIFY:TRACK:abc',
+             'spotify:track:line\nbreak:id', 'prefix spotify:track:xyz', 'spotify:track:ünïcödé']
+
+
+def legacy_select_columns(df):
+    for old_col, new_col in COLUMN_MAPPING.items():
+        if old_col in df.columns:
+            df.rename(columns={old_col: new_col}, inplace=True)
+
+    available_columns = [col for col in REQUIRED_COLUMNS if col in df.columns]
+    return df[available_columns]
+
+
+def legacy_normalize_values(df):
+    for col in df.columns:
+        if col in TEXT_COLUMNS:
+            df[col] = df[col].fillna("")
+
+    if 'spotify_id' in df.columns:
+        df['spotify_id'] = df['spotify_id'].apply(
+            lambda x: x.split(':')[-1] if isinstance(x, str) and 'spotify:track:' in x else ""
+        )
+
+    if 'duration' in df.columns:
+        df['duration'] = df['duration'].fillna(0).astype(np.int32)
+
+    return df
+
+
+def with_edge_cases(raw, seed):
+    """A copy of a raw export with edge case values in every tenth row"""
+    rng = np.random.default_rng(seed)
+    raw = raw.copy()
+    rows = np.arange(0, len(raw), 10)
+    raw.loc[rows, 'Track URI'] = rng.choice(np.array(EDGE_URIS, dtype=object), len(rows))
+    raw.loc[rows[::3], 'Album'] = np.nan
+    raw.loc[rows[1::3], 'Artist Genres'] = np.nan
+    raw['Duration (ms)'] = raw['Duration (ms)'].astype(float)
+    raw.loc[rows[2::3], 'Duration (ms)'] = np.nan
+    return raw
+
+
+def small_frames():
+    """Hand-written frames for dtypes the synthetic export does not produce"""
+    uris = EDGE_URIS + ['spotify:track:0123456789abcdefghijkl']
+    yield 'object URIs', pd.DataFrame({'Track URI': pd.Series(uris, dtype=object), 'Track Name': 'x'})
+    yield 'mixed URIs', pd.DataFrame({'Track URI': pd.Series([1, 2.5, b'spotify:track:x', None, 'spotify:track:a'],
+                                                             dtype=object)})
+    yield 'missing URIs', pd.DataFrame({'Track URI': [np.nan, np.nan], 'Album': [np.nan, 'a']})
+    yield 'no URIs', pd.DataFrame({'Track Name': ['a', None], 'Duration (ms)': [1.0, np.nan]})
+    # One source column per name; the legacy renaming would duplicate spotify_id
+    yield 'empty', pd.DataFrame({name: pd.Series([], dtype=object) for name in COLUMN_MAPPING
+                                 if name != 'spotify_link'})
+    yield 'link column', pd.DataFrame({'spotify_link': ['spotify:track:a', None], 'Track Name': ['a', 'b']})
+    yield 'renamed already', pd.DataFrame({'track_name': ['a'], 'spotify_id': ['spotify:track:a'], 'Album': [None]})
+
+
+def run(select, normalize, raw):
+    return normalize(select(raw.copy()))
+
+
+def check(label, raw):
+    """Number of mismatches (0 or 1) between the two implementations on ``raw``"""
+    expected = run(legacy_select_columns, legacy_normalize_values, raw)
+    actual = run(select_columns, normalize_values, raw)
+    try:
+        pd.testing.assert_frame_equal(actual, expected)
+    except AssertionError as error:
+        print(f"MISMATCH {label}: {error}")
+        return 1
+    return 0
+
+
+def best_time(func, raw, repeat):
+    times = []
+    for _ in range(repeat):
+        frame = raw.copy()
+        start = time.perf_counter()
+        func(frame)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tracks', type=int, default=300_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    raw = make_catalog(args.tracks, seed=args.seed)
+    edge = with_edge_cases(raw, args.seed)
+    mismatches = check('export', raw) + check('export with edge cases', edge)
+    mismatches += check('export as object columns', edge.astype(object))
+    for label, frame in small_frames():
+        mismatches += check(label, frame)
+
+    print(f"{'':<24}{'seconds':>10}{'rows/s':>14}")
+    for frame_label, frame in (('export', raw), ('edge cases', edge)):
+        for label, select, normalize in (('legacy', legacy_select_columns, legacy_normalize_values),
+                                         ('vectorized', select_columns, normalize_values)):
+            seconds = best_time(lambda copy: normalize(select(copy)), frame, args.repeat)
+            print(f"{frame_label:<12}{label:<12}{seconds:>10.3f}{len(frame) / seconds:>14,.0f}")
+    print(f"{mismatches} mismatches")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
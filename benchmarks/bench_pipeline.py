@@ -0,0 +1,203 @@
+"""Time each stage of the recommendation pipeline on a synthetic catalog.
+
+Generates a catalog with ``synthetic_catalog.make_catalog`` (or reads an
+existing export), then runs every stage separately: CSV load, preprocessing,
+genre inference, index builds, singer matching, TF-IDF fitting and
+recommendations. Query stages replay popularity-weighted, partly misspelt
+singer names and report per-call percentiles; the original full-scan paths
+(``find_closest_singer`` without an index and ``get_recommendations`` without
+prebuilt indexes) only replay the first ``--legacy-queries`` queries.
+
+Each stage records its wall time, and unless ``--no-memory`` is given, the
+peak traced allocation of a second, traced run and the process RSS after it.
+Results can be written as JSON and compared with an earlier run to catch
+regressions between versions:
+
+    python benchmarks/bench_pipeline.py --tracks 300000 --output bench.json
+    python benchmarks/bench_pipeline.py --tracks 300000 --baseline bench.json --tolerance 0.2
+
+Result and singer caches are disabled so repeated queries are measured cold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import result_cache  # noqa: E402
+from artist_index import ArtistIndex  # noqa: E402
+from catalog_ingest import current_rss_mb, ingest_csv, preprocess_data  # noqa: E402
+from genre_inference import infer_genre, infer_genres  # noqa: E402
+from recommendation_index import RecommendationIndex  # noqa: E402
+from recommender import find_closest_singer, get_recommendations, train_tfidf  # noqa: E402
+from row_index import RowIndex  # noqa: E402
+from synthetic_catalog import make_catalog, make_queries  # noqa: E402
+
+RESULT_FORMAT = 1
+
+
+class StageTimer:
+    """Runs stages, prints a line per stage and collects machine-readable records"""
+
+    def __init__(self, memory=True, repeat=1):
+        self.memory = memory
+        self.repeat = repeat
+        self.stages = []
+
+    def run(self, name, func, calls=None):
+        """Time ``func()`` once, or ``func(*args)`` for each args tuple in ``calls``; returns the last result
+
+        With ``repeat`` above one the fastest of the repeated runs is kept.
+        """
+        per_call = calls is not None
+        calls = calls if per_call else [()]
+        timings = None
+        result = None
+        for _ in range(self.repeat):
+            run_timings = []
+            for args in calls:
+                start = time.perf_counter()
+                result = func(*args)
+                run_timings.append(time.perf_counter() - start)
+            if timings is None or sum(run_timings) < sum(timings):
+                timings = run_timings
+
+        record = {'name': name, 'seconds': round(sum(timings), 6), 'calls': len(calls)}
+        if per_call and timings:
+            record['p50_ms'] = round(float(np.percentile(timings, 50)) * 1000, 3)
+            record['p95_ms'] = round(float(np.percentile(timings, 95)) * 1000, 3)
+        if self.memory:
+            tracemalloc.start()
+            for args in calls:
+                func(*args)
+            record['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+        rss = current_rss_mb()
+        record['rss_mb'] = round(rss, 1) if rss is not None else None
+        self.stages.append(record)
+
+        latency = f" (p50 {record['p50_ms']:.2f}ms, p95 {record['p95_ms']:.2f}ms)" if 'p50_ms' in record else ""
+        memory = f", peak {record['peak_mb']:.1f} MB" if 'peak_mb' in record else ""
+        print(f"{name:<30} {record['seconds']:>9.3f}s{latency}{memory}")
+        return result
+
+
+def git_commit():
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True)
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(stages, baseline_path, tolerance):
+    """Print per-stage time ratios against a baseline run; returns the regressed stage names"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {stage['name']: stage for stage in json.load(f)['stages']}
+    regressions = []
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for stage in stages:
+        before = baseline.get(stage['name'])
+        if not before or not before['seconds']:
+            continue
+        ratio = stage['seconds'] / before['seconds']
+        flag = ' REGRESSION' if ratio > 1 + tolerance else ''
+        print(f"{stage['name']:<30} {before['seconds']:>9.3f}s -> {stage['seconds']:>9.3f}s ({ratio:.2f}x){flag}")
+        if flag:
+            regressions.append(stage['name'])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', help='existing export to benchmark instead of a synthetic catalog')
+    parser.add_argument('--tracks', type=int, default=100_000)
+    parser.add_argument('--artists', type=int)
+    parser.add_argument('--albums', type=int)
+    parser.add_argument('--genre-strings', type=int, default=64)
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of artist popularity')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--legacy-queries', type=int, default=20,
+                        help='queries replayed through the full-scan paths')
+    parser.add_argument('--repeat', type=int, default=1, help='keep the fastest of this many runs per stage')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced run that measures peak memory')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before flagging a stage')
+    args = parser.parse_args()
+
+    # Measure cold queries; warm caches would hide the pipeline's own cost
+    result_cache.result_cache.max_entries = 0
+    result_cache.singer_cache.max_entries = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.csv
+        if path is None:
+            path = os.path.join(tmp, 'catalog.csv')
+            start = time.perf_counter()
+            make_catalog(args.tracks, args.artists, args.albums, args.genre_strings, args.skew,
+                         seed=args.seed).to_csv(path, index=False)
+            print(f"Generated {args.tracks} tracks in {time.perf_counter() - start:.1f}s")
+
+        timer = StageTimer(memory=not args.no_memory, repeat=max(1, args.repeat))
+        raw = timer.run('csv_load', lambda: pd.read_csv(path))
+        df = timer.run('preprocess_data', lambda: preprocess_data(raw))
+        del raw
+        timer.run('ingest_csv', lambda: ingest_csv(path))
+        timer.run('infer_genre', lambda: df.apply(infer_genre, axis=1))
+        df['genre'] = timer.run('infer_genres', lambda: infer_genres(df))
+        index = timer.run('build_recommendation_index', lambda: RecommendationIndex.build(df))
+        artist_index = timer.run('build_artist_index', lambda: ArtistIndex.from_dataframe(df))
+        row_index = timer.run('build_row_index', lambda: RowIndex.build(df))
+
+        popularity = df['artist_name'].value_counts()
+        queries = make_queries(popularity.index.tolist(), args.queries, seed=args.seed, weights=popularity.values)
+        legacy = [(query,) for query in queries[:args.legacy_queries]]
+
+        timer.run('find_closest_singer', lambda query: find_closest_singer(query, df), legacy)
+        timer.run('artist_index_lookup', lambda query: artist_index.lookup(query), [(query,) for query in queries])
+        singer_rows = [(df.iloc[row_index.artist_rows(artist)],)
+                       for artist in map(artist_index.lookup, queries[:args.legacy_queries]) if artist]
+        timer.run('train_tfidf', train_tfidf, singer_rows)
+        timer.run('get_recommendations', lambda query: get_recommendations(query, df), legacy)
+        timer.run('get_recommendations_indexed',
+                  lambda query: get_recommendations(query, df, 10, None, index, artist_index=artist_index,
+                                                    row_index=row_index),
+                  [(query,) for query in queries])
+
+    results = {
+        'format': RESULT_FORMAT,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'baseline', 'tolerance')},
+        'rows': len(df),
+        'artists': int(len(popularity)),
+        'stages': timer.stages,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote results to {args.output}")
+
+    if args.baseline and compare(timer.stages, args.baseline, args.tolerance):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Compare ``pruned`` with dense ``global`` scoring on the largest artists.
+
+Generates a synthetic catalog, builds its recommendation index and replays
+queries against the artists with the most tracks: the singer's name alone,
+with one of their track titles, with a random title word, and with a genre
+filter. For every query the top ``k`` rows and scores of pruned scoring, of
+the inverted index with pruning switched off (``exact=True``) and of the
+dense path must be identical; any difference is reported and fails the run.
+
+    python benchmarks/bench_pruned_scoring.py --tracks 1000000 -k 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_ingest import preprocess_data  # noqa: E402
+from genre_inference import infer_genres  # noqa: E402
+from ranking import top_k_sparse  # noqa: E402
+from recommendation_index import RecommendationIndex  # noqa: E402
+from synthetic_catalog import TITLE_WORDS, make_catalog  # noqa: E402
+
+
+def ranked(similarity, positions, k):
+    top = top_k_sparse(similarity, k)
+    return positions[top], similarity[:, top].toarray().ravel()
+
+
+def make_queries(df, index, artists, per_artist, seed):
+    """(artist, query text, genre filter) triples for the given artists"""
+    rng = random.Random(seed)
+    queries = []
+    for artist in artists:
+        rows = index.artist_rows(artist)
+        name = df['artist_name'].iloc[rows[0]]
+        genre_counts = df['genre'].iloc[rows].value_counts()
+        genres = genre_counts[genre_counts > 0].index.tolist()
+        for _ in range(per_artist):
+            title = df['track_name'].iloc[rows[rng.randrange(len(rows))]]
+            queries.append((artist, f"{name} {name}", None))
+            queries.append((artist, f"{name} {title}", None))
+            queries.append((artist, f"{name} {rng.choice(TITLE_WORDS)}", None))
+            queries.append((artist, f"{name} {title}", genres[-1]))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tracks', type=int, default=300_000)
+    parser.add_argument('--artists', type=int, default=3, help='largest artists to query')
+    parser.add_argument('--queries', type=int, default=10, help='queries of each kind per artist')
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = preprocess_data(make_catalog(args.tracks, seed=args.seed))
+    df['genre'] = infer_genres(df)
+    index = RecommendationIndex.build(df)
+    start = time.perf_counter()
+    inverted = index.inverted_index()
+    print(f"Built posting lists for {len(df)} tracks in {time.perf_counter() - start:.1f}s")
+
+    sizes = np.diff(index.artist_offsets)
+    artists = [index.artist_keys[i] for i in np.argsort(-sizes, kind='stable')[:args.artists]]
+    print("Largest artists: " + ', '.join(f"{artist} ({len(index.artist_rows(artist))} tracks)" for artist in artists))
+    queries = make_queries(df, index, artists, args.queries, args.seed)
+
+    timings = {'global': 0.0, 'pruned': 0.0}
+    scored = {'exact': 0, 'pruned': 0}
+    mismatches = 0
+    for artist, query, genre in queries:
+        positions = index.artist_rows(artist)
+        row_mask = df['genre'].iloc[positions].to_numpy() == genre if genre else None
+        results = {}
+        for mode in ('global', 'pruned'):
+            start = time.perf_counter()
+            positions, similarity = index.score_many([query], artist, row_mask, mode, dense_output=False, k=args.k)
+            results[mode] = ranked(similarity, positions, args.k)
+            timings[mode] += time.perf_counter() - start
+            if mode == 'pruned':
+                scored['pruned'] += similarity.nnz
+
+        vector = index.global_vectors([query])
+        rows, scores = inverted.search(vector, index._artist_lookup[artist], args.k, row_mask, exact=True)
+        scored['exact'] += len(rows)
+        similarity = type(vector)((scores, rows, [0, len(rows)]), shape=(1, len(positions)))
+        results['exact'] = ranked(similarity, positions, args.k)
+
+        expected_rows, expected_scores = results['global']
+        for mode in ('pruned', 'exact'):
+            rows, scores = results[mode]
+            if not (np.array_equal(rows, expected_rows) and np.array_equal(scores, expected_scores)):
+                mismatches += 1
+                print(f"MISMATCH {mode}: {query!r} genre={genre}")
+
+    count = len(queries)
+    print(f"{'dense global':<14} {timings['global'] / count * 1000:>8.2f} ms/query")
+    print(f"{'pruned':<14} {timings['pruned'] / count * 1000:>8.2f} ms/query  "
+          f"rescored {scored['pruned'] / count:.1f} rows/query, {scored['exact'] / count:.0f} without pruning")
+    print(f"{count} queries, {mismatches} mismatches")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Time cross-artist ``ShardedScorer.search`` with increasing worker counts.
+
+Generates a synthetic catalog, builds its recommendation index and replays
+track-title queries against the whole catalog with each worker count. Every
+run is checked against the single-shard, in-process result, which must match
+exactly whatever the number of shards.
+
+    python benchmarks/bench_sharded_scoring.py --tracks 1000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_ingest import preprocess_data  # noqa: E402
+from recommendation_index import RecommendationIndex  # noqa: E402
+from sharded_scoring import ShardedScorer  # noqa: E402
+from synthetic_catalog import make_catalog  # noqa: E402
+
+
+def same_results(expected, actual):
+    return all(np.array_equal(e_rows, a_rows) and np.array_equal(e_scores, a_scores)
+               for (e_rows, e_scores), (a_rows, a_scores) in zip(expected, actual))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tracks', type=int, default=300_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=50, help='queries per search call')
+    parser.add_argument('-k', type=int, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = preprocess_data(make_catalog(args.tracks, seed=args.seed))
+    start = time.perf_counter()
+    index = RecommendationIndex.build(df)
+    index.global_matrix()
+    print(f"Indexed {len(df)} tracks by {len(index.artist_keys)} artists in {time.perf_counter() - start:.1f}s")
+
+    queries = df['track_name'].sample(args.queries, random_state=args.seed).tolist()
+    batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+
+    with ShardedScorer(index, workers=1, shards=1) as scorer:
+        start = time.perf_counter()
+        expected = [result for batch in batches for result in scorer.search(batch, args.k)]
+        baseline = time.perf_counter() - start
+    print(f"{'1 shard, in process':<24} {baseline:>8.3f}s  {len(queries) / baseline:>8.1f} queries/s")
+
+    for workers in args.workers:
+        with ShardedScorer(index, workers) as scorer:
+            # Start the workers before timing
+            scorer.search(batches[0][:1], args.k)
+            start = time.perf_counter()
+            results = [result for batch in batches for result in scorer.search(batch, args.k)]
+            seconds = time.perf_counter() - start
+        label = f"{workers} workers, {len(scorer.shards)} shards"
+        check = 'identical' if same_results(expected, results) else 'MISMATCH'
+        print(f"{label:<24} {seconds:>8.3f}s  {len(queries) / seconds:>8.1f} queries/s  "
+              f"{baseline / seconds:>5.2f}x  {check}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Report the app's startup milestones in fresh processes.
+
+Each run starts a new Python process that renders the app with Streamlit's
+``AppTest`` and asks for recommendations ``--think`` seconds after the search
+form appeared, like a user typing. It reports the milestones recorded by ``startup.py``,
+measured from the moment the process was launched:
+
+- ``first_paint``: header, sidebar and settings rendered
+- ``catalog_ready``: the warm-up thread has loaded the catalog
+- ``interactive``: the search form is rendered
+- ``first_recommendation``: the first result has been computed
+
+and the latency of that first search (``search_ms``).
+
+``eager`` runs import pandas, scikit-learn and the catalog modules before the
+app, like the app's module level imports used to. Every run uses an empty
+working directory, so the catalog and its index are built from scratch, unless
+``--keep-disk-cache`` is given.
+
+    python benchmarks/bench_startup.py --runs 5
+    CATALOG_BUNDLE=catalog_bundle/ python benchmarks/bench_startup.py --modes deferred
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'streamlit_hindi_songs_app.py')
+MILESTONES = ('first_paint', 'catalog_ready', 'interactive', 'first_recommendation')
+EAGER_IMPORTS = ('pandas', 'catalog', 'catalog_ingest', 'catalog_store', 'recommendation_service')
+
+
+def run_app(mode, singer, think, launched):
+    """Child process: render the app, search once and print the startup report as JSON"""
+    sys.path.insert(0, ROOT)
+    if mode == 'eager':
+        for module in EAGER_IMPORTS:
+            __import__(module)
+    from streamlit.testing.v1 import AppTest
+
+    import startup
+
+    app = AppTest.from_file(APP, default_timeout=600)
+    app.run()
+    # AppTest returns once the whole script has run; the user started typing when the form appeared
+    typing_since = launched + startup.report(since=launched)['interactive']
+    time.sleep(max(0.0, typing_since + think - time.time()))
+    app.text_input[0].input(singer)
+    startup.mark('search')
+    app.button[0].click().run()
+    if app.exception:
+        raise SystemExit(f"The app raised: {app.exception[0].value}")
+    print(json.dumps(startup.report(since=launched)))
+
+
+def measure(mode, args):
+    """Launch one child process and return its milestones"""
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+    with tempfile.TemporaryDirectory() as scratch:
+        cwd = os.getcwd() if args.keep_disk_cache else scratch
+        launched = time.time()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', mode, '--singer', args.singer,
+             '--think', str(args.think), '--launched', repr(launched)],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--modes', nargs='+', choices=('deferred', 'eager'), default=['eager', 'deferred'])
+    parser.add_argument('--singer', default='Arijit Singh')
+    parser.add_argument('--think', type=float, default=2.0, help='seconds between the search form appearing and the search')
+    parser.add_argument('--keep-disk-cache', action='store_true',
+                        help='run in the current directory and reuse its catalog cache and index')
+    parser.add_argument('--child', choices=('deferred', 'eager'), help=argparse.SUPPRESS)
+    parser.add_argument('--launched', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_app(args.child, args.singer, args.think, args.launched)
+        return
+
+    print(f"Median seconds from process launch over {args.runs} runs ({args.think:g}s think time)")
+    print(f"{'mode':<10}" + ''.join(f"{name:>22}" for name in MILESTONES) + f"{'search_ms':>12}")
+    for mode in args.modes:
+        reports = [measure(mode, args) for _ in range(args.runs)]
+        medians = [statistics.median(report[name] for report in reports) if all(name in report for report in reports)
+                   else float('nan') for name in MILESTONES]
+        search_ms = statistics.median((report['first_recommendation'] - report['search']) * 1000 for report in reports)
+        print(f"{mode:<10}" + ''.join(f"{value:>22.3f}" for value in medians) + f"{search_ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Compare full ``argsort`` ranking with partial top-k selection.
+
+Scores are sparse like real query similarities: most rows share no term with
+the query. For growing candidate sets the script times the original
+``argsort()[-k:][::-1]``, ``top_k`` on the dense row and ``top_k_sparse`` on
+the sparse row, and checks both top-k variants return the same ranking.
+
+    python benchmarks/bench_top_k.py --k 20 --density 0.05
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ranking import top_k, top_k_sparse  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--density', type=float, default=0.05, help='share of rows with a non-zero score')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'argsort':>10} {'top_k':>10} {'sparse':>10}")
+    for size in SIZES:
+        row = sparse.random(1, size, density=args.density, format='csr', random_state=rng)
+        # Rounded scores produce ties, as repeated track titles do
+        row.data = np.round(row.data, 2)
+        dense = row.toarray().ravel()
+
+        if not np.array_equal(top_k(dense, args.k), top_k_sparse(row, args.k)):
+            raise SystemExit(f"top_k and top_k_sparse disagree for {size} rows")
+
+        full = best_of(lambda: dense.argsort()[-args.k:][::-1], args.repeat)
+        partial = best_of(lambda: top_k(dense, args.k), args.repeat)
+        on_sparse = best_of(lambda: top_k_sparse(row, args.k), args.repeat)
+        print(f"{size:>10} {full * 1000:>8.2f}ms {partial * 1000:>8.2f}ms {on_sparse * 1000:>8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Drive recommendations with simulated concurrent users.
+
+Each user is a thread that searches, waits ``--think`` seconds and searches
+again until ``--duration`` is over. A ``--trending`` share of searches goes to
+a handful of popular singers, the rest to random artists. Reports throughput,
+latency percentiles, rejected and timed out requests and the executor's queue
+metrics.
+
+In process, against a catalog, with the result cache off so that every
+request is computed and coalescing is visible, with and without it::
+
+    python benchmarks/load_test.py songs.csv --users 64 --duration 20 --no-result-cache --compare
+
+Against a running recommendation service, taking singer names from the
+catalog it serves::
+
+    python benchmarks/load_test.py songs.csv --service http://127.0.0.1:8765 --users 64
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommendation_executor import (EXECUTOR_QUEUE_SIZE, EXECUTOR_WORKERS, ExecutorBusy,  # noqa: E402
+                                     RecommendationExecutor)
+from service_client import RecommendationClient  # noqa: E402
+
+PERCENTILES = (50, 90, 99)
+
+
+def simulate(recommend, singers, trending, args):
+    """Run the simulated users; returns per-outcome counts and the latencies of answered requests"""
+    deadline = time.perf_counter() + args.duration
+    lock = threading.Lock()
+    latencies = []
+    outcomes = {'ok': 0, 'busy': 0, 'timeout': 0, 'error': 0}
+
+    def user(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            singer = rng.choice(trending) if rng.random() < args.trending else rng.choice(singers)
+            start = time.perf_counter()
+            try:
+                recommend(singer, args.num_recommendations)
+                outcome = 'ok'
+            except ExecutorBusy:
+                outcome = 'busy'
+            except TimeoutError:
+                outcome = 'timeout'
+            except (OSError, ValueError):
+                outcome = 'error'
+            seconds = time.perf_counter() - start
+            with lock:
+                outcomes[outcome] += 1
+                if outcome == 'ok':
+                    latencies.append(seconds)
+            time.sleep(rng.expovariate(1 / args.think) if args.think > 0 else 0)
+
+    threads = [threading.Thread(target=user, args=(args.seed + i,)) for i in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, np.array(latencies) * 1000
+
+
+def report(label, outcomes, latencies, duration, executor_stats=None):
+    percentiles = np.percentile(latencies, PERCENTILES) if len(latencies) else [float('nan')] * len(PERCENTILES)
+    line = (f"{label:<16} {outcomes['ok'] / duration:>8.1f} req/s  "
+            + '  '.join(f"p{p} {value:>7.1f}ms" for p, value in zip(PERCENTILES, percentiles))
+            + f"  busy {outcomes['busy']}  timeout {outcomes['timeout']}  error {outcomes['error']}")
+    print(line)
+    if executor_stats:
+        print(f"{'':<16} computed {executor_stats['submitted']}, coalesced {executor_stats['coalesced']}, "
+              f"peak queue {executor_stats['peak_queued']}, mean queue wait {executor_stats['mean_queue_wait_ms']}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('catalog', help='CSV export or catalog bundle directory')
+    parser.add_argument('--service', help='URL of a running recommendation service serving the catalog')
+    parser.add_argument('--users', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per run')
+    parser.add_argument('--think', type=float, default=0.05, help='mean seconds between a user\'s searches')
+    parser.add_argument('--trending', type=float, default=0.6, help='share of searches for trending singers')
+    parser.add_argument('--trending-singers', type=int, default=5)
+    parser.add_argument('-n', '--num-recommendations', type=int, default=10)
+    parser.add_argument('--scoring', default='exact')
+    parser.add_argument('--workers', type=int, default=EXECUTOR_WORKERS)
+    parser.add_argument('--queue-size', type=int, default=EXECUTOR_QUEUE_SIZE)
+    parser.add_argument('--timeout', type=float, default=None, help='per-request timeout in seconds')
+    parser.add_argument('--no-result-cache', action='store_true', help='compute every request (in process only)')
+    parser.add_argument('--compare', action='store_true', help='also run without coalescing (in process only)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from catalog import open_catalog
+    from result_cache import result_cache
+
+    catalog = open_catalog(args.catalog)
+    singers = list(catalog.artist_index.artists)
+    rng = random.Random(args.seed)
+    trending = rng.sample(singers, min(args.trending_singers, len(singers)))
+
+    if args.service:
+        client = RecommendationClient(args.service)
+        summary = client.summary()
+        print(f"Loading {args.service} ({summary['songs']} songs) with {args.users} users for {args.duration:g}s")
+        outcomes, latencies = simulate(client.recommend, singers, trending, args)
+        report('service', outcomes, latencies, args.duration, client.metrics().get('executor'))
+        return
+
+    if args.no_result_cache:
+        result_cache.max_entries = 0
+    print(f"Loading {len(catalog.df)} songs by {len(singers)} artists in process with {args.users} users "
+          f"for {args.duration:g}s")
+
+    for coalesce in ((True, False) if args.compare else (True,)):
+        result_cache.clear()
+        executor = RecommendationExecutor(args.workers, args.queue_size, coalesce=coalesce)
+
+        def recommend(singer, num_recommendations):
+            return catalog.recommend_shared(singer, num_recommendations, scoring=args.scoring, timeout=args.timeout,
+                                            executor=executor)
+
+        outcomes, latencies = simulate(recommend, singers, trending, args)
+        report('coalesced' if coalesce else 'not coalesced', outcomes, latencies, args.duration, executor.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""Synthetic songs catalogs shaped like a Spotify export.
+
+``make_catalog`` generates a raw export (``Track Name``, ``Artist Name``,
+``Album``, ``Duration (ms)``, ``Artist Genres``, ``Track URI``) with a
+configurable number of tracks, artists, albums and distinct genre strings.
+Artist popularity follows a Zipf distribution, so a few artists own most of
+the tracks as in real catalogs, and a small share of rows are exact duplicates
+for ``preprocess_data`` to drop. Output is deterministic for a given seed.
+
+Write a catalog to CSV with::
+
+    python benchmarks/synthetic_catalog.py songs.csv --tracks 1000000 --artists 50000
+"""
+import argparse
+import random
+
+import numpy as np
+import pandas as pd
+
+SYLLABLES = ['a', 'ri', 'jit', 'sin', 'gh', 'shre', 'ya', 'gho', 'shal', 'so', 'nu', 'ni', 'gam', 'la',
+             'ta', 'man', 'ge', 'shkar', 'ku', 'mar', 'sa', 'nu', 'ud', 'it', 'na', 'ra', 'yan', 'mo',
+             'hit', 'chau', 'han', 'at', 'if', 'as', 'lam', 'kai', 'lash', 'kher', 'ne', 'ha', 'kak', 'kar']
+TITLE_WORDS = ['dil', 'tum', 'hi', 'ho', 'ishq', 'pyaar', 'mohabbat', 'sanam', 'yaara', 'tera', 'mera', 'jaan',
+               'raat', 'din', 'chand', 'sitare', 'baarish', 'sapna', 'zindagi', 'khuda', 'rab', 'mann', 'naina',
+               'saathiya', 'judaai', 'intezaar', 'humsafar', 'dhadkan', 'aashiqui', 'kal', 'aaj', 'phir', 'se',
+               'kabhi', 'love', 'the', 'and', 'of', 'you', 'me', 'remix', 'unplugged', 'reprise', 'version']
+# Terms the genre rules look for, mixed with ones they ignore
+GENRE_TERMS = ['modern bollywood', 'filmi', 'classic bollywood', 'sufi', 'ghazal', 'bhajan', 'hare krishna',
+               'chutney', 'bhojpuri pop', 'afghan pop', 'classic pakistani pop', 'classic punjabi pop',
+               'desi pop', 'indian indie', 'punjabi hip hop', 'sufi rock', 'indian folk', 'hindustani classical']
+ALBUM_WORDS = ['Aashiqui', 'Devotional Hits', 'Bhajan Sandhya', 'Bhojpuri Superhits', 'Retro Classics',
+               'Love Songs', 'Unplugged', 'Soundtrack', 'Greatest Hits', 'Live', 'Sessions', 'Chapter']
+BASE62 = np.array(list('0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+
+def make_artists(count, seed=0):
+    """Generate distinct two or three word artist names"""
+    rng = random.Random(seed)
+    # A list keeps generation order; iterating a set would depend on PYTHONHASHSEED
+    names = []
+    seen = set()
+    while len(names) < count:
+        words = [''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).capitalize()
+                 for _ in range(rng.randint(2, 3))]
+        name = ' '.join(words)
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def make_queries(artists, count, seed=1, weights=None):
+    """Exact, case-changed, misspelt and truncated versions of real artists
+
+    With ``weights`` artists are drawn by popularity, with repeats, like real
+    search traffic; otherwise ``count`` distinct artists are used.
+    """
+    rng = random.Random(seed)
+    if weights is None:
+        chosen = rng.sample(artists, count)
+    else:
+        chosen = rng.choices(artists, weights=weights, k=count)
+    queries = []
+    for artist in chosen:
+        kind = rng.randrange(4)
+        if kind == 0:
+            queries.append(artist)
+        elif kind == 1:
+            queries.append(artist.upper())
+        elif kind == 2:
+            position = rng.randrange(len(artist))
+            queries.append(artist[:position] + rng.choice('aeiou') + artist[position + 1:])
+        else:
+            queries.append(artist[:max(4, len(artist) * 2 // 3)])
+    return queries
+
+
+def make_partial_queries(artists, count, seed=2):
+    """Single words, fragments and reversed word orders of ``count`` distinct artists
+
+    These are the queries where fuzzy matching leans on partial and token
+    ratios, and where many artists tie on the best score.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for i, artist in enumerate(rng.sample(artists, count)):
+        words = artist.split()
+        kind = i % 3
+        if kind == 0:
+            queries.append(rng.choice(words))
+        elif kind == 1:
+            start = rng.randrange(len(artist) // 3 + 1)
+            queries.append(artist[start:start + max(4, len(artist) // 2)])
+        else:
+            queries.append(' '.join(reversed(words)))
+    return queries
+
+
+def zipf_weights(count, exponent):
+    """Popularity weights for ranks 1..count, summing to one"""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _join_words(rng, words, rows, max_words):
+    words = np.array(words, dtype=object)
+    lengths = rng.integers(1, max_words + 1, size=rows)
+    picks = words[rng.integers(len(words), size=(rows, max_words))]
+    return [' '.join(row[:length]) for row, length in zip(picks.tolist(), lengths)]
+
+
+def make_catalog(tracks, artists=None, albums=None, genre_strings=64, skew=1.1, duplicate_rate=0.02, seed=0):
+    """Generate a raw export with Zipf-distributed artist popularity"""
+    artists = artists or max(1, tracks // 60)
+    albums = albums or max(1, tracks // 10)
+    rng = np.random.default_rng(seed)
+
+    artist_names = np.array(make_artists(artists, seed), dtype=object)
+    weights = zipf_weights(artists, skew)
+
+    # Each artist has one genre string, as in Spotify exports
+    genre_pool = np.array([', '.join(rng.choice(GENRE_TERMS, size=rng.integers(1, 4), replace=False))
+                           for _ in range(genre_strings)], dtype=object)
+    artist_genres = genre_pool[rng.integers(genre_strings, size=artists)]
+
+    # Albums belong to artists in proportion to their popularity
+    album_artist = rng.choice(artists, size=albums, p=weights)
+    album_names = np.array([f"{name} {i}" for i, name in
+                            enumerate(_join_words(rng, ALBUM_WORDS, albums, 2))], dtype=object)
+    albums_by_artist = np.argsort(album_artist, kind='stable')
+    album_counts = np.bincount(album_artist, minlength=artists)
+    album_offsets = np.cumsum(album_counts) - album_counts
+
+    unique_tracks = tracks - int(tracks * duplicate_rate)
+    track_artist = rng.choice(artists, size=unique_tracks, p=weights)
+    # A random album of the track's artist, or none for artists without albums
+    counts = album_counts[track_artist]
+    picks = album_offsets[track_artist] + (rng.random(unique_tracks) * counts).astype(np.int64)
+    track_album = np.where(counts > 0, albums_by_artist[np.minimum(picks, albums - 1)], -1)
+    uri_chars = BASE62[rng.integers(len(BASE62), size=(unique_tracks, 22))]
+
+    df = pd.DataFrame({
+        'Track Name': _join_words(rng, TITLE_WORDS, unique_tracks, 4),
+        'Artist Name': artist_names[track_artist],
+        'Album': np.where(track_album >= 0, album_names[np.maximum(track_album, 0)], ''),
+        'Duration (ms)': rng.normal(240_000, 45_000, size=unique_tracks).clip(60_000).astype(np.int64),
+        'Artist Genres': artist_genres[track_artist],
+        'Track URI': ['spotify:track:' + ''.join(chars) for chars in uri_chars.tolist()],
+    })
+    duplicates = df.iloc[rng.integers(unique_tracks, size=tracks - unique_tracks)]
+    return pd.concat([df, duplicates], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic songs catalog CSV')
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('--tracks', type=int, default=100_000)
+    parser.add_argument('--artists', type=int, help='defaults to one artist per 60 tracks')
+    parser.add_argument('--albums', type=int, help='defaults to one album per 10 tracks')
+    parser.add_argument('--genre-strings', type=int, default=64, help='distinct artist genre strings')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of artist popularity')
+    parser.add_argument('--duplicate-rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = make_catalog(args.tracks, args.artists, args.albums, args.genre_strings, args.skew,
+                      args.duplicate_rate, args.seed)
+    df.to_csv(args.output, index=False)
+    print(f"Wrote {len(df)} tracks by {df['Artist Name'].nunique()} artists to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""The loaded catalog: the preprocessed songs frame and the indexes and statistics derived from it."""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from artist_index import ArtistIndex
+from catalog_ingest import ingest_csv
+from catalog_stats import CatalogStats
+from catalog_store import load_bundle_stats, load_catalog_bundle, snapshot_path
+from genre_inference import infer_genres
+from neighbor_graph import load_neighbor_graph
+from recommendation_index import TEXT_COLUMNS as INDEXED_COLUMNS
+from recommendation_index import load_or_build_index
+from recommendation_executor import recommendation_executor
+from recommender import display_songs, get_recommendations
+from result_cache import normalize_input, result_cache
+from row_index import RowIndex
+
+
+def _column_bytes(series):
+    """Bytes that identify a column's values, for ``catalog_version``"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = '\x00'.join(str(value) for value in series.cat.categories)
+        return series.cat.codes.to_numpy().tobytes() + categories.encode('utf-8', 'surrogatepass')
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return str(series.dtype).encode() + np.ascontiguousarray(series.to_numpy()).tobytes()
+    try:
+        return '\x00'.join(series.to_numpy(dtype=object)).encode('utf-8', 'surrogatepass')
+    except TypeError:
+        # Missing or non-string values
+        return pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes()
+
+
+def catalog_version(df, fingerprint):
+    """Hash of every column of a catalog frame
+
+    ``fingerprint`` is the recommendation index fingerprint, which already
+    covers the indexed text columns; genres, durations, Spotify IDs and any
+    other column are added to it, so catalogs that differ only there, like a
+    corrected re-upload, get different versions.
+    """
+    digest = hashlib.sha1(fingerprint.encode('utf-8'))
+    for name in df.columns:
+        if name not in INDEXED_COLUMNS:
+            digest.update(f"\x00{name}\x00".encode('utf-8'))
+            digest.update(_column_bytes(df[name]))
+    return digest.hexdigest()
+
+
+class Catalog:
+    """Preprocessed songs with their recommendation, artist and row indexes and dataset statistics
+
+    ``version`` identifies the catalog's contents; results cached for one
+    version are never served for another.
+    """
+
+    def __init__(self, df, index, artist_index, row_index, ingest_report=None, stats=None):
+        self.df = df
+        self.index = index
+        self.artist_index = artist_index
+        self.row_index = row_index
+        self.ingest_report = ingest_report
+        self.stats = stats if stats is not None else CatalogStats.from_frame(df)
+        self.version = catalog_version(df, index.fingerprint)
+
+    def _compute(self, user_input, num_recommendations, genre_filter, scoring):
+        return get_recommendations(user_input, self.df, num_recommendations, genre_filter, self.index, scoring,
+                                   self.artist_index, self.row_index)
+
+    def _result_key(self, user_input, num_recommendations, genre_filter, scoring):
+        return self.version, scoring, normalize_input(user_input), genre_filter, num_recommendations
+
+    def recommend(self, user_input, num_recommendations=10, genre_filter=None, scoring='exact', use_cache=True):
+        """``get_recommendations`` against this catalog's indexes, cached in ``result_cache``"""
+        if not use_cache:
+            return self._compute(user_input, num_recommendations, genre_filter, scoring)
+        key = self._result_key(user_input, num_recommendations, genre_filter, scoring)
+        result = result_cache.get_or_compute(
+            key, lambda: self._compute(user_input, num_recommendations, genre_filter, scoring)
+        )
+        # Callers may modify the frame they get, e.g. to render links
+        return result.copy()
+
+    def recommend_shared(self, user_input, num_recommendations=10, genre_filter=None, scoring='exact', timeout=None,
+                         executor=None):
+        """``recommend``, computing cache misses on the process-wide ``recommendation_executor``
+
+        Concurrent identical requests share one computation. Raises
+        ``ExecutorBusy`` when too many requests are queued and ``TimeoutError``
+        when the result takes longer than ``timeout`` seconds.
+        """
+        key = self._result_key(user_input, num_recommendations, genre_filter, scoring)
+        result = result_cache.get(key)
+        if result is None:
+            def compute():
+                value = self._compute(user_input, num_recommendations, genre_filter, scoring)
+                result_cache.put(key, value)
+                return value
+
+            result = (executor or recommendation_executor).run(key, compute, timeout)
+        return result.copy()
+
+    def similar_songs(self, position, n=10):
+        """Songs nearest to the song at a dataframe position, from the prebuilt neighbour graph
+
+        Returns a frame of songs with a ``score`` column, or None if no graph
+        has been built for this dataset (see ``neighbor_graph.py``).
+        """
+        graph = load_neighbor_graph(self.index.fingerprint)
+        if graph is None:
+            return None
+        positions, scores = graph.neighbors_of(position, n)
+        songs = display_songs(self.df.iloc[positions])
+        songs['score'] = scores
+        return songs
+
+    def summary(self):
+        """Dataset counts and genre list from the precomputed ``CatalogStats``"""
+        return self.stats.summary()
+
+
+def build_catalog(df, ingest_report=None, stats=None):
+    """Infer genres and build the indexes and statistics for a preprocessed frame"""
+    # Add genre column, unless it was stored with the catalog
+    if 'genre' not in df.columns:
+        df['genre'] = infer_genres(df)
+
+    # Load the prebuilt recommendation index, building it on first use
+    index = load_or_build_index(df)
+    artist_index = ArtistIndex.from_dataframe(df)
+    return Catalog(df, index, artist_index, RowIndex.build(df), ingest_report, stats)
+
+
+def open_catalog(path):
+    """Load a catalog from a CSV export or a catalog bundle directory"""
+    if os.path.isdir(path):
+        # Resolve the live snapshot once, so the songs and their statistics are the same version
+        path = snapshot_path(path)
+        return build_catalog(load_catalog_bundle(path), stats=load_bundle_stats(path))
+    df, ingest_report = ingest_csv(path)
+    return build_catalog(df, ingest_report)
@@ -0,0 +1,140 @@
+"""Content-hash keyed cache for parsed and preprocessed catalogs.
+
+Streamlit re-executes the app script on every widget interaction, but imported
+modules stay loaded, so a module level cache survives reruns. Entries are keyed
+by a hash of the uploaded file's bytes and kept in two tiers:
+
+- memory: the most recently used catalogs, evicted least recently used first
+- disk: pickled catalogs under ``CACHE_DIR``, also evicted least recently used
+  first, so a restarted worker can skip parsing a file it has seen before
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.environ.get('CATALOG_CACHE_DIR', '.catalog_cache')
+# Bump when the cached catalog layout changes so stale disk entries are ignored
+CACHE_VERSION = 11
+MAX_MEMORY_ENTRIES = 4
+MAX_DISK_ENTRIES = 16
+
+
+def content_hash(data):
+    """Hash the raw bytes of an uploaded file"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class CatalogCache:
+    """Two-tier LRU cache of catalogs keyed by content hash"""
+
+    def __init__(self, directory=CACHE_DIR, max_memory_entries=MAX_MEMORY_ENTRIES,
+                 max_disk_entries=MAX_DISK_ENTRIES):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for a key, or None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        value = self._read_disk(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a value in both tiers"""
+        self._remember(key, value)
+        self._write_disk(key, value)
+
+    def get_or_create(self, key, factory, persist=True):
+        """Return the cached value for a key, building it with ``factory`` on a miss
+
+        With ``persist=False`` the value is only kept in memory, e.g. for
+        catalogs that are already memory-mapped from disk.
+        """
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            if persist:
+                self.put(key, value)
+            else:
+                self._remember(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        for path in self._disk_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"v{CACHE_VERSION}-{key}.pkl")
+
+    def _disk_entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith('.pkl')]
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            # Access time drives disk eviction
+            os.utime(path)
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def _write_disk(self, key, value):
+        if self.max_disk_entries <= 0:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # A read-only deployment still gets the memory tier
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for path in self._disk_entries():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_disk_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,244 @@
+"""CSV ingestion and preprocessing for the songs catalog.
+
+``preprocess_data`` normalizes a dataframe that is already in memory.
+``ingest_csv`` produces the same catalog from a CSV file while only holding one
+chunk of raw text at a time: only the columns the app uses are parsed, each
+chunk is renamed, deduplicated against the rows kept so far with an
+incremental set of row hashes, and normalized, and the kept values are
+accumulated per column and assembled into the final frame one column at a
+time. Resident memory is sampled after every chunk, reported, and can be
+capped with ``max_rss_mb``.
+
+Row hashes are 64-bit and only the hashes are kept, so two different rows
+whose hashes collide are treated as duplicates and the later one is dropped,
+where ``drop_duplicates`` compares whole rows. The chance is about n²/2^65
+for n distinct rows (around 3 in a million at 10 million rows). Pass
+``exact_dedup=True`` (or set ``INGEST_EXACT_DEDUP=1``) to compare the
+(track, artist, album) keys themselves instead, at the cost of keeping every
+kept key in memory.
+
+Catalogs are kept compact: repetitive text columns (``CATEGORICAL_COLUMNS``
+and the inferred ``genre``) are categoricals, durations are integer
+milliseconds and Spotify URIs are reduced to bare track IDs with vectorized
+string operations. Durations and links are only formatted for the songs that
+are displayed (see ``recommender.display_songs``).
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+COLUMN_MAPPING = {
+    'Track Name': 'track_name',
+    'Artist Name': 'artist_name',
+    'Track URI': 'spotify_id',
+    # Exports written by earlier versions of the app
+    'spotify_link': 'spotify_id',
+    'Album': 'album',
+    'Duration (ms)': 'duration',
+    'Artist Genres': 'artist_genres'
+}
+REQUIRED_COLUMNS = ['track_name', 'artist_name', 'spotify_id', 'album', 'duration', 'artist_genres']
+TEXT_COLUMNS = ['track_name', 'artist_name', 'album', 'artist_genres']
+DEDUP_COLUMNS = ['track_name', 'artist_name', 'album']
+# Few distinct values repeated over many rows
+CATEGORICAL_COLUMNS = ['artist_name', 'album', 'artist_genres']
+SPOTIFY_TRACK_PREFIX = 'spotify:track:'
+CHUNK_SIZE = 100_000
+# Optional cap on resident memory during ingestion, e.g. INGEST_MAX_RSS_MB=2048
+MAX_RSS_MB = float(os.environ['INGEST_MAX_RSS_MB']) if os.environ.get('INGEST_MAX_RSS_MB') else None
+# Deduplicate on the full keys rather than their 64-bit hashes
+EXACT_DEDUP = os.environ.get('INGEST_EXACT_DEDUP', '').lower() in ('1', 'true', 'yes')
+
+
+def select_columns(df):
+    """Rename known export columns and keep only the ones the app uses
+
+    When several columns map to the same name, the one already carrying it or
+    else the first in ``COLUMN_MAPPING`` is kept.
+    """
+    renames = {}
+    for old_col, new_col in COLUMN_MAPPING.items():
+        if old_col in df.columns and new_col not in df.columns and new_col not in renames.values():
+            renames[old_col] = new_col
+    # One rename and one selection; with copy-on-write neither copies the column data
+    df = df.rename(columns=renames)
+    available_columns = [col for col in REQUIRED_COLUMNS if col in df.columns]
+    return df[available_columns]
+
+
+def spotify_track_ids(uris):
+    """Track IDs of a column of Spotify track URIs, the text after their last colon
+
+    Values that are not ``spotify:track:`` URIs, including missing and
+    non-string values, become empty strings.
+    """
+    if uris.empty:
+        # Keep the dtype of an empty column, as the per-value parsing did
+        return uris.copy()
+    if pd.api.types.infer_dtype(uris, skipna=True) not in ('string', 'empty'):
+        uris = uris.where(np.fromiter((isinstance(value, str) for value in uris), dtype=bool, count=len(uris)))
+    uris = uris.astype('str')
+    is_track = uris.str.contains(SPOTIFY_TRACK_PREFIX, regex=False, na=False)
+    ids = uris.str.slice(len(SPOTIFY_TRACK_PREFIX))
+    # Nearly all URIs are the prefix followed by the ID; the rest keep the text after their last colon
+    irregular = is_track & ~(uris.str.startswith(SPOTIFY_TRACK_PREFIX, na=False)
+                             & ~ids.str.contains(':', regex=False, na=False))
+    if irregular.any():
+        # (?s): like str.split, the last colon may follow a line break
+        ids[irregular] = uris[irregular].str.replace(r'(?s)^.*:', '', regex=True)
+    return ids.where(is_track, '')
+
+
+def normalize_values(df):
+    """Fill missing text, reduce Spotify URIs to track IDs and durations to integer milliseconds"""
+    # Fill missing values
+    text_columns = [col for col in df.columns if col in TEXT_COLUMNS]
+    if text_columns:
+        df = df.fillna({col: "" for col in text_columns})
+
+    # Keep the track ID of Spotify URIs
+    if 'spotify_id' in df.columns:
+        df['spotify_id'] = spotify_track_ids(df['spotify_id'])
+
+    # Missing durations are shown as 0:00
+    if 'duration' in df.columns:
+        df['duration'] = df['duration'].fillna(0).astype(np.int32)
+
+    return df
+
+
+def encode_categories(df):
+    """Store the ``CATEGORICAL_COLUMNS`` of a frame as categoricals"""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def preprocess_data(df):
+    """Preprocess the uploaded data"""
+    df = select_columns(df)
+
+    # Remove duplicates
+    df = df.drop_duplicates(subset=DEDUP_COLUMNS).reset_index(drop=True)
+
+    return encode_categories(normalize_values(df))
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None if unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Peak rather than current, but the best portable approximation
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+
+def row_hashes(df):
+    """64-bit hash of each row's duplicate key (track, artist, album)"""
+    return pd.util.hash_pandas_object(df[DEDUP_COLUMNS], index=False).to_numpy()
+
+
+class _DedupSet:
+    """Sorted array of 64-bit row hashes seen so far"""
+
+    def __init__(self):
+        self.seen = np.array([], dtype=np.uint64)
+
+    def first_occurrences(self, df):
+        """Mask of rows whose key has not been seen in this or an earlier chunk"""
+        hashes = row_hashes(df)
+        keep = np.zeros(len(hashes), dtype=bool)
+        unique_hashes, first = np.unique(hashes, return_index=True)
+        keep[first] = True
+        keep &= ~np.isin(hashes, self.seen, assume_unique=False)
+        self.seen = np.union1d(self.seen, unique_hashes)
+        return keep
+
+
+class _ExactDedupSet:
+    """Set of the (track, artist, album) keys seen so far, compared in full"""
+
+    def __init__(self):
+        self.seen = set()
+
+    def first_occurrences(self, df):
+        """Mask of rows whose key has not been seen in this or an earlier chunk"""
+        # Missing values become None so that they compare equal, as in drop_duplicates
+        columns = [df[col].astype(object).where(df[col].notna(), None).tolist() for col in DEDUP_COLUMNS]
+        keep = np.zeros(len(df), dtype=bool)
+        for position, key in enumerate(zip(*columns)):
+            if key not in self.seen:
+                self.seen.add(key)
+                keep[position] = True
+        return keep
+
+
+def ingest_csv(source, chunksize=CHUNK_SIZE, max_rss_mb=MAX_RSS_MB, exact_dedup=EXACT_DEDUP):
+    """Stream a CSV export into a preprocessed catalog
+
+    Returns the catalog dataframe and a report dict with row counts, timing
+    and the peak resident memory sampled during ingestion. Raises
+    ``MemoryError`` as soon as resident memory exceeds ``max_rss_mb``.
+    Duplicates are found by row hash unless ``exact_dedup`` is set.
+    """
+    start = time.perf_counter()
+    report = {'chunks': 0, 'rows_read': 0, 'rows_kept': 0, 'duplicates': 0, 'peak_rss_mb': None}
+
+    def sample_memory():
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        report['peak_rss_mb'] = max(report['peak_rss_mb'] or 0, rss)
+        if max_rss_mb is not None and rss > max_rss_mb:
+            raise MemoryError(
+                f"Ingestion used {rss:.0f} MB, above the {max_rss_mb:.0f} MB limit. "
+                f"Try a smaller chunk size or a smaller file."
+            )
+
+    wanted = set(COLUMN_MAPPING) | set(REQUIRED_COLUMNS)
+    text_sources = [old for old, new in COLUMN_MAPPING.items() if new in TEXT_COLUMNS] + TEXT_COLUMNS
+    # Parse text columns as strings so chunks agree on their dtypes
+    reader = pd.read_csv(source, chunksize=chunksize, usecols=lambda col: col in wanted,
+                         dtype={col: str for col in text_sources})
+
+    dedup = _ExactDedupSet() if exact_dedup else _DedupSet()
+    columns = {}
+    for chunk in reader:
+        report['chunks'] += 1
+        report['rows_read'] += len(chunk)
+        chunk = select_columns(chunk)
+        chunk = chunk[dedup.first_occurrences(chunk)]
+        chunk = normalize_values(chunk)
+        report['rows_kept'] += len(chunk)
+        for col in chunk.columns:
+            columns.setdefault(col, []).append(chunk[col].to_numpy())
+        del chunk
+        sample_memory()
+
+    # Assemble one column at a time so raw chunks and the result never coexist in full
+    data = {}
+    for col in list(columns):
+        parts = columns.pop(col)
+        values = np.concatenate(parts) if parts else np.array([], dtype=object)
+        del parts
+        data[col] = pd.Series(pd.Categorical(values) if col in CATEGORICAL_COLUMNS else values)
+        del values
+    df = pd.DataFrame(data)
+    sample_memory()
+
+    report['duplicates'] = report['rows_read'] - report['rows_kept']
+    report['seconds'] = time.perf_counter() - start
+    return df, report
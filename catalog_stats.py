@@ -0,0 +1,82 @@
+"""Dataset statistics computed once per catalog version.
+
+The dataset overview, the genre selectbox and the service's ``/catalog``
+summary used to count distinct artists, albums and genres over the whole
+frame on every Streamlit rerun. ``CatalogStats`` keeps those counts together
+with the values they were counted from: the number of songs and the
+distinct artists, genres and albums, in order of first appearance.
+
+They are computed when a catalog is built, saved with catalog bundles and
+snapshots (see ``catalog_store``) and with cached catalogs, and ``extended``
+updates them from appended rows only (see ``catalog_update.apply_delta``), so
+reading them never scans the songs. Artists are counted by exact name, like
+``nunique``; recommendations group them case-insensitively, and the per-artist
+genre counts come from ``RowIndex``, which needs them to slice its groups.
+"""
+import json
+import os
+
+import pandas as pd
+
+STATS_FILE = 'stats.json'
+
+
+def _distinct(series):
+    """Distinct non-missing values of a column, in order of first appearance"""
+    return [str(value) for value in pd.unique(series.dropna())]
+
+
+def _appended(values, series):
+    """``values`` followed by the distinct values of ``series`` it does not contain yet"""
+    seen = set(values)
+    return values + [value for value in _distinct(series) if value not in seen]
+
+
+class CatalogStats:
+    """Song count and the distinct artists, genres and albums of a catalog"""
+
+    def __init__(self, songs, artists, genres, albums=None):
+        self.songs = int(songs)
+        self.artists = list(artists)
+        self.genres = list(genres)
+        self.albums = None if albums is None else list(albums)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Statistics of a preprocessed catalog frame with a ``genre`` column"""
+        albums = _distinct(df['album']) if 'album' in df.columns else None
+        return cls(len(df), _distinct(df['artist_name']), _distinct(df['genre']), albums)
+
+    def extended(self, new_rows):
+        """Statistics after appending ``new_rows`` to this catalog
+
+        New artists, genres and albums are added after the existing ones, in
+        the order ``from_frame`` would find them in the combined frame.
+        """
+        albums = self.albums
+        if albums is not None and 'album' in new_rows.columns:
+            albums = _appended(albums, new_rows['album'])
+        return CatalogStats(self.songs + len(new_rows), _appended(self.artists, new_rows['artist_name']),
+                            _appended(self.genres, new_rows['genre']), albums)
+
+    def summary(self):
+        """Song, artist, genre and album counts plus the sorted genre list"""
+        return {
+            'songs': self.songs,
+            'artists': len(self.artists),
+            'albums': len(self.albums) if self.albums is not None else None,
+            'genres': sorted(self.genres),
+        }
+
+    def save(self, path):
+        """Write the statistics into a bundle directory"""
+        with open(os.path.join(path, STATS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'songs': self.songs, 'artists': self.artists, 'genres': self.genres,
+                       'albums': self.albums}, f)
+
+    @classmethod
+    def load(cls, path):
+        """Statistics saved into a bundle directory by ``save``"""
+        with open(os.path.join(path, STATS_FILE), encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['songs'], data['artists'], data['genres'], data['albums'])
@@ -0,0 +1,218 @@
+"""Columnar binary storage for preprocessed catalogs.
+
+A catalog bundle is a directory with a ``manifest.json`` and one or two files
+per column:
+
+- numeric columns are stored as ``<column>.npy``
+- string columns are dictionary encoded: ``<column>.codes.npy`` holds int32
+  codes (-1 for missing values) and ``<column>.values.bin`` the distinct
+  values as NUL separated UTF-8
+- categorical columns are stored the same way, from their own codes (in the
+  integer width pandas uses for their number of categories) and categories,
+  and load back as categoricals
+
+Arrays are memory-mapped on load, so Streamlit workers on one machine share a
+single page-cache copy of the numeric columns and of the categorical codes;
+only the distinct categories are read into each process. Other string
+columns (``track_name``, ``spotify_id``) are decoded into per-process object
+arrays, since pandas cannot keep Python strings in a shared mapping: one
+``split`` over their distinct values plus a vectorized take, instead of
+parsing CSV text.
+
+Export a CSV to a bundle with::
+
+    python catalog_store.py songs.csv catalog_bundle/
+
+Bundles can also carry the catalog's ``CatalogStats`` (``stats.json``), so
+loading them skips recounting the songs; the manifest records whether they
+were saved.
+
+A snapshot directory holds numbered bundles (``v000001``, ``v000002``, ...)
+and a ``CURRENT`` file naming the live one. ``publish_snapshot`` writes the
+next bundle completely before switching ``CURRENT`` with an atomic rename, so
+readers of a snapshot directory always load a whole catalog version. Loading
+functions accept a snapshot directory wherever they accept a bundle.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from catalog_stats import CatalogStats
+
+STORE_VERSION = 2
+SEPARATOR = '\x00'
+CURRENT_FILE = 'CURRENT'
+KEEP_SNAPSHOTS = 3
+SNAPSHOT_PATTERN = re.compile(r'^v(\d{6})$')
+
+
+def _is_string_column(series):
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def save_catalog_bundle(df, path, stats=None):
+    """Write a preprocessed catalog frame, and optionally its ``CatalogStats``, to a bundle directory"""
+    os.makedirs(path, exist_ok=True)
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        categorical = isinstance(series.dtype, pd.CategoricalDtype)
+        if categorical or _is_string_column(series):
+            if categorical:
+                codes, values = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, values = pd.factorize(series)
+            values = list(values)
+            if any(not isinstance(value, str) for value in values):
+                raise ValueError(f"Column '{name}' mixes strings with other values")
+            if any(SEPARATOR in value for value in values):
+                raise ValueError(f"Column '{name}' contains NUL characters")
+            # Categorical codes keep their width so loading can use the mapped file as is
+            np.save(os.path.join(path, f"{name}.codes.npy"), codes if categorical else codes.astype(np.int32))
+            with open(os.path.join(path, f"{name}.values.bin"), 'wb') as f:
+                f.write(SEPARATOR.join(values).encode('utf-8'))
+            columns.append({'name': name, 'encoding': 'dictionary', 'size': len(values),
+                            'categorical': categorical})
+        elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            np.save(os.path.join(path, f"{name}.npy"), series.to_numpy())
+            columns.append({'name': name, 'encoding': 'numeric'})
+        else:
+            raise ValueError(f"Column '{name}' has unsupported dtype {series.dtype}")
+    if stats is not None:
+        stats.save(path)
+
+    # The manifest is written last so a partial export is never loadable
+    with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': STORE_VERSION, 'rows': len(df), 'columns': columns, 'stats': stats is not None}, f)
+
+
+def _read_values(path, size):
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8')
+    values = text.split(SEPARATOR) if size else []
+    # Missing values are stored as code -1, which picks the trailing NaN
+    return np.array(values + [np.nan], dtype=object)
+
+
+def load_catalog_bundle(path, mmap=True):
+    """Load a bundle written by ``save_catalog_bundle`` into a dataframe
+
+    Numeric columns and the codes of categorical columns stay backed by the
+    memory-mapped files; other string columns are decoded into object arrays
+    owned by this process.
+    """
+    path = snapshot_path(path)
+    with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != STORE_VERSION:
+        raise ValueError(f"Unsupported catalog bundle version {manifest.get('version')}")
+
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for column in manifest['columns']:
+        name = column['name']
+        if column['encoding'] == 'dictionary':
+            codes = np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode=mmap_mode)
+            values = _read_values(os.path.join(path, f"{name}.values.bin"), column['size'])
+            if column['categorical']:
+                data[name] = pd.Series(pd.Categorical.from_codes(codes, values[:-1].tolist()), copy=False)
+            else:
+                data[name] = pd.Series(values.take(codes), dtype=object, copy=False)
+        else:
+            data[name] = pd.Series(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode), copy=False)
+    return pd.DataFrame(data, copy=False)
+
+
+def load_bundle_stats(path):
+    """The ``CatalogStats`` saved with a bundle, or None if it was saved without them
+
+    Pass the path returned by ``snapshot_path`` when loading the songs of a
+    snapshot directory too, so both come from the same snapshot.
+    """
+    path = snapshot_path(path)
+    with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if not manifest.get('stats'):
+        return None
+    try:
+        stats = CatalogStats.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return stats if stats.songs == manifest['rows'] else None
+
+
+def bundle_fingerprint(path):
+    """Identify a bundle by its path and manifest timestamp"""
+    manifest = os.path.join(os.path.abspath(snapshot_path(path)), 'manifest.json')
+    return f"{manifest}:{os.path.getmtime(manifest)}"
+
+
+def current_snapshot(root):
+    """Version number of the live snapshot under ``root``, or None"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding='utf-8') as f:
+            match = SNAPSHOT_PATTERN.match(f.read().strip())
+    except OSError:
+        return None
+    return int(match.group(1)) if match else None
+
+
+def snapshot_path(path):
+    """Bundle directory of the live snapshot if ``path`` is a snapshot directory, else ``path``"""
+    version = current_snapshot(path)
+    return path if version is None else os.path.join(path, f"v{version:06d}")
+
+
+def publish_snapshot(df, root, keep=KEEP_SNAPSHOTS, stats=None):
+    """Write ``df`` (and its ``stats``) as the next snapshot under ``root``, make it current and return its version
+
+    Only the newest ``keep`` snapshots are kept. Publishers must not run
+    concurrently on the same directory.
+    """
+    os.makedirs(root, exist_ok=True)
+    versions = sorted(int(match.group(1)) for match in map(SNAPSHOT_PATTERN.match, os.listdir(root)) if match)
+    version = (versions[-1] if versions else 0) + 1
+    name = f"v{version:06d}"
+
+    staging = tempfile.mkdtemp(prefix=f".{name}-", dir=root)
+    try:
+        save_catalog_bundle(df, staging, stats)
+        os.replace(staging, os.path.join(root, name))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix='.current-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(name)
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+    # Readers that already resolved an older snapshot keep its memory-mapped files open
+    for old in versions[:max(0, len(versions) + 1 - keep)]:
+        shutil.rmtree(os.path.join(root, f"v{old:06d}"), ignore_errors=True)
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a songs CSV to a columnar catalog bundle')
+    parser.add_argument('csv', help='CSV export with Track Name, Artist Name, Album, ... columns')
+    parser.add_argument('bundle', help='output directory')
+    args = parser.parse_args()
+
+    from catalog_ingest import ingest_csv
+    from genre_inference import infer_genres
+
+    df, report = ingest_csv(args.csv)
+    df['genre'] = infer_genres(df)
+    save_catalog_bundle(df, args.bundle, CatalogStats.from_frame(df))
+    print(f"Exported {report['rows_kept']} songs to {args.bundle}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Incremental catalog updates from delta CSVs.
+
+Re-uploading the full export reruns preprocessing, genre inference and every
+index build. ``apply_delta`` instead takes only the new tracks: it drops the
+ones whose (track, artist, album) key is already in the catalog, infers genres
+for the rest and extends the existing indexes and dataset statistics with them
+(see the ``extended`` methods of ``RecommendationIndex``, ``RowIndex``,
+``ArtistIndex`` and ``CatalogStats``). The result equals a catalog built from
+the existing export with the delta appended, as rows already in the catalog
+win over their duplicates, like a re-upload.
+
+Catalogs are never modified in place. ``apply_delta`` returns a new
+``Catalog``, so code holding the previous one keeps a consistent view, and
+``publish_catalog`` writes it as a new snapshot that becomes visible to readers
+in a single atomic switch (see ``catalog_store``).
+
+Command line usage::
+
+    python catalog_update.py catalog_snapshots/ new_tracks.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from catalog import Catalog, build_catalog, open_catalog
+from catalog_ingest import TEXT_COLUMNS, ingest_csv, row_hashes
+from catalog_store import KEEP_SNAPSHOTS, current_snapshot, publish_snapshot
+from genre_inference import infer_genres
+from recommendation_index import index_path
+
+
+def apply_delta(catalog, delta):
+    """Catalog with the tracks of a preprocessed delta frame appended
+
+    Returns the new catalog and a report dict with the rows added, the
+    duplicates skipped and the artists whose songs changed.
+    """
+    start_time = time.perf_counter()
+    df = catalog.df
+    new_rows = delta[~np.isin(row_hashes(delta), row_hashes(df))].reset_index(drop=True)
+    report = {
+        'rows_read': len(delta),
+        'rows_added': len(new_rows),
+        'duplicates': len(delta) - len(new_rows),
+        'affected_artists': int(new_rows['artist_name'].str.lower().nunique()),
+    }
+    if new_rows.empty:
+        report['seconds'] = time.perf_counter() - start_time
+        return catalog, report
+
+    # Genres are only inferred for the new rows
+    if 'genre' not in new_rows.columns:
+        new_rows['genre'] = infer_genres(new_rows)
+    new_rows = new_rows.reindex(columns=df.columns)
+    for col in TEXT_COLUMNS:
+        if col in new_rows.columns:
+            new_rows[col] = new_rows[col].fillna('')
+    updated = pd.concat([df, new_rows], ignore_index=True)
+    # concat falls back to plain values when the categories differ
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            added = new_rows[col].astype('category').cat.remove_unused_categories()
+            updated[col] = union_categoricals([df[col], added], sort_categories=True)
+
+    start = len(df)
+    new_artists = new_rows['artist_name'].unique()
+    catalog = Catalog(
+        updated,
+        catalog.index.extended(updated, start),
+        catalog.artist_index.extended(new_artists),
+        catalog.row_index.extended(updated, start),
+        stats=catalog.stats.extended(new_rows),
+    )
+    report['seconds'] = time.perf_counter() - start_time
+    return catalog, report
+
+
+def publish_catalog(catalog, root, keep=KEEP_SNAPSHOTS):
+    """Save a catalog's index and publish its songs as the next snapshot under ``root``"""
+    # Saved first, so readers opening the new snapshot find the index instead of rebuilding it
+    try:
+        catalog.index.save(index_path(catalog.index.fingerprint))
+    except OSError:
+        pass
+    return publish_snapshot(catalog.df, root, keep, catalog.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Append new tracks from a delta CSV to a catalog snapshot')
+    parser.add_argument('snapshots', help='snapshot directory; created from the delta if it has no snapshot yet')
+    parser.add_argument('delta', help='CSV export with the new tracks')
+    parser.add_argument('--keep', type=int, default=KEEP_SNAPSHOTS, help='number of snapshots to keep')
+    args = parser.parse_args()
+
+    delta, _ = ingest_csv(args.delta)
+    if current_snapshot(args.snapshots) is None:
+        catalog, report = build_catalog(delta), {'rows_added': len(delta), 'duplicates': 0}
+    else:
+        catalog, report = apply_delta(open_catalog(args.snapshots), delta)
+
+    if report['rows_added']:
+        version = publish_catalog(catalog, args.snapshots, args.keep)
+        print(f"Added {report['rows_added']} songs ({report['duplicates']} duplicates skipped); "
+              f"snapshot v{version:06d} is now current")
+    else:
+        print(f"No new songs ({report['duplicates']} duplicates skipped); snapshot unchanged")
+
+
+if __name__ == '__main__':
+    main()
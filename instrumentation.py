@@ -0,0 +1,223 @@
+"""Optional stage timers, counters and profiling for the recommendation path.
+
+Instrumentation is off unless ``RECOMMENDER_INSTRUMENTATION=1`` is set or
+``enable()`` is called. While off, ``timed`` functions only pay for one global
+flag check and ``stage`` returns a shared no-op context manager.
+
+While on, every stage records a call count, total and maximum time and a
+latency histogram, and ``increment`` bumps named counters. The data can be read
+as a dict (``snapshot``), as Prometheus text exposition format
+(``prometheus_text``) or as one JSON log line per stage on the
+``recommender.instrumentation`` logger at DEBUG level.
+
+``profile_request`` captures a single request with ``cProfile`` or a simple
+sampling profiler and returns a text report, independently of the flag.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+ENABLED = os.environ.get('RECOMMENDER_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+# Upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PROFILE_MODES = ('cprofile', 'sampling')
+SAMPLE_INTERVAL = 0.001
+PROFILE_LINES = 30
+
+logger = logging.getLogger('recommender.instrumentation')
+
+_lock = threading.Lock()
+_stages = {}
+_counters = Counter()
+_NOOP = nullcontext()
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    """Drop all recorded timings and counters"""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def record(name, seconds):
+    """Add one timing to a stage"""
+    with _lock:
+        stats = _stages.get(name)
+        if stats is None:
+            stats = _stages[name] = {'count': 0, 'seconds': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKETS)}
+        stats['count'] += 1
+        stats['seconds'] += seconds
+        stats['max'] = max(stats['max'], seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stats['buckets'][i] += 1
+                break
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({'stage': name, 'seconds': round(seconds, 6)}))
+
+
+def increment(name, value=1):
+    """Bump a named counter"""
+    if ENABLED:
+        with _lock:
+            _counters[name] += value
+
+
+@contextmanager
+def _timing(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def stage(name):
+    """Context manager timing a block as stage ``name`` while instrumentation is on"""
+    return _timing(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    """Decorator timing every call of a function as stage ``name`` while instrumentation is on"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Recorded stages and counters as a JSON-ready dict"""
+    with _lock:
+        stages = {
+            name: {
+                'count': stats['count'],
+                'seconds': round(stats['seconds'], 6),
+                'mean_ms': round(stats['seconds'] / stats['count'] * 1000, 3),
+                'max_ms': round(stats['max'] * 1000, 3),
+            }
+            for name, stats in _stages.items()
+        }
+        return {'enabled': ENABLED, 'stages': stages, 'counters': dict(_counters)}
+
+
+def prometheus_text(prefix='recommender'):
+    """Stages as a histogram and counters as counters, in Prometheus text exposition format"""
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent in each recommendation stage.",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    with _lock:
+        for name, stats in sorted(_stages.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, stats['buckets']):
+                cumulative += count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stats["seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines.append(f"# HELP {prefix}_events_total Counted recommendation events.")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(_counters.items()):
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class _Sampler:
+    """Counts the functions on one thread's stack at a fixed interval"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.inclusive = Counter()
+        self.leaf = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.leaf[self._label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                label = self._label(frame)
+                if label not in seen:
+                    seen.add(label)
+                    self.inclusive[label] += 1
+                frame = frame.f_back
+
+    @staticmethod
+    def _label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, lines=PROFILE_LINES):
+        if not self.samples:
+            return 'No samples collected; the request finished within one sampling interval.\n'
+        out = [f"{self.samples} samples every {self.interval * 1000:g}ms", '', 'inclusive  self  function']
+        for label, count in self.inclusive.most_common(lines):
+            out.append(f"{count / self.samples:>8.1%} {self.leaf[label] / self.samples:>6.1%}  {label}")
+        return '\n'.join(out) + '\n'
+
+
+@contextmanager
+def profile_request(mode='cprofile', lines=PROFILE_LINES):
+    """Profile the enclosed block; the yielded dict gets a ``report`` text when it exits"""
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'. Use one of: {', '.join(PROFILE_MODES)}")
+    result = {'mode': mode, 'report': None}
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(lines)
+            result['report'] = out.getvalue()
+    else:
+        sampler = _Sampler(threading.get_ident())
+        sampler.start()
+        try:
+            yield result
+        finally:
+            sampler.stop()
+            result['report'] = sampler.report(lines)
@@ -0,0 +1,147 @@
+"""Inverted index with MaxScore pruning for top-k scoring of large artists.
+
+``global`` scoring multiplies the query with every row of the matched artist.
+For compilation-heavy artists with tens of thousands of tracks most of that
+work goes to rows that cannot make the top ``k``. ``pruned`` scoring uses the
+same catalog-wide TF-IDF weights through term posting lists instead.
+
+The index keeps, for every term, the rows containing it and the term's
+weight in each row (the L2-normalized TF-IDF matrix in column order, so the
+row norms are already divided out), plus the term's highest weight within
+each artist. A query is scored term at a time into one accumulator per row
+of the artist:
+
+1. Terms found in every row of the artist, like the singer's name that every
+   search starts with, are added from one contiguous slice of their postings.
+2. The other terms follow, highest possible contribution first. After each
+   one, the ``k``-th best partial score is a lower bound of the final
+   ``k``-th score, and rows whose partial score plus the most the remaining
+   terms could add stays below it are dropped (MaxScore). Once few rows are
+   left, long posting lists are only probed for those rows rather than
+   scanned.
+3. The rows within rounding of the ``k``-th best score are rescored with the
+   dense path's ``cosine_similarity``, so their scores are bit for bit the
+   same and ties are broken in the same row order.
+
+Only rows sharing at least one query term get a score; all others score zero,
+as in the dense path. ``exact=True`` skips the pruning in step 2 and rescores
+every row sharing a query term, to check the pruned results against it.
+"""
+import os
+
+import numpy as np
+from scipy import sparse
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Artists with fewer rows are scored densely; pruning would not pay for itself
+PRUNING_MIN_ROWS = int(os.environ.get('PRUNING_MIN_ROWS', 4096))
+# Partial sums and the dense path add up scores in different orders
+SCORE_TOLERANCE = 1e-9
+# Probe a posting list instead of scanning it when it is this many times longer than the candidates
+PROBE_RATIO = 8
+
+
+class InvertedIndex:
+    """Posting lists and per-artist term maxima of L2-normalized TF-IDF rows grouped by artist"""
+
+    def __init__(self, matrix, artist_offsets):
+        self.matrix = matrix.tocsr()
+        self.artist_offsets = np.asarray(artist_offsets, dtype=np.int64)
+        # Column order: each term's rows, sorted, with their weights
+        self.postings = self.matrix.tocsc()
+        self.postings.sort_indices()
+
+        # Each term's highest weight per artist; entries of one (term, artist) pair are adjacent
+        row_artist = np.repeat(np.arange(len(self.artist_offsets) - 1), np.diff(self.artist_offsets))
+        entry_term = np.repeat(np.arange(self.postings.shape[1]), np.diff(self.postings.indptr))
+        entry_artist = row_artist[self.postings.indices]
+        boundary = np.ones(len(entry_artist), dtype=bool)
+        boundary[1:] = (np.diff(entry_artist) != 0) | (np.diff(entry_term) != 0)
+        first = np.flatnonzero(boundary)
+        maxima = np.maximum.reduceat(self.postings.data, first) if len(first) else self.postings.data[:0]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(entry_term[first], minlength=self.postings.shape[1]))])
+        self.artist_max = sparse.csc_matrix((maxima, entry_artist[first], indptr),
+                                            shape=(len(self.artist_offsets) - 1, self.postings.shape[1]))
+
+    def _term_rows(self, term, start, stop):
+        """Rows of ``start:stop`` containing a term, relative to ``start``, and the term's weights"""
+        begin, end = self.postings.indptr[term], self.postings.indptr[term + 1]
+        rows = self.postings.indices[begin:end]
+        low, high = np.searchsorted(rows, [start, stop])
+        return rows[low:high] - start, self.postings.data[begin + low:begin + high]
+
+    def _upper_bound(self, term, artist_position):
+        """A term's highest weight among an artist's rows"""
+        begin, end = self.artist_max.indptr[term], self.artist_max.indptr[term + 1]
+        artists = self.artist_max.indices[begin:end]
+        i = np.searchsorted(artists, artist_position)
+        return self.artist_max.data[begin + i] if i < len(artists) and artists[i] == artist_position else 0.0
+
+    def search(self, query_vector, artist_position, k, row_mask=None, exact=False):
+        """Scores of the rows of one artist that can rank among the best ``k``
+
+        ``query_vector`` is a 1 x terms sparse row and ``row_mask`` optionally
+        restricts the artist's rows, as in ``RecommendationIndex.score_many``.
+        Returns the scored rows, as positions among the artist's (masked)
+        rows, and their scores. Rows that are not returned score zero, or
+        less than the ``k`` best returned rows. With ``exact=True`` every row
+        sharing a query term is scored.
+        """
+        query_vector = query_vector.tocsr()
+        start, stop = self.artist_offsets[artist_position], self.artist_offsets[artist_position + 1]
+        count = stop - start
+        scores = np.zeros(count)
+        if row_mask is not None:
+            row_mask = np.asarray(row_mask, dtype=bool)
+            scores[~row_mask] = -np.inf
+
+        # Terms in every row are one contiguous slice of their postings
+        partial = []
+        for term, weight in zip(query_vector.indices, query_vector.data):
+            rows, weights = self._term_rows(term, start, stop)
+            if len(rows) == count:
+                scores += weight * weights
+            elif len(rows):
+                partial.append((weight * self._upper_bound(term, artist_position), weight, rows, weights))
+        partial.sort(key=lambda item: -item[0])
+
+        remaining = sum(bound for bound, _, _, _ in partial)
+        candidates = None
+        for bound, weight, rows, weights in partial:
+            remaining -= bound
+            if candidates is None or len(rows) < PROBE_RATIO * len(candidates):
+                scores[rows] += weight * weights
+            else:
+                # Only candidate rows can still make the top k
+                found = np.minimum(np.searchsorted(rows, candidates), len(rows) - 1)
+                hit = rows[found] == candidates
+                scores[candidates[hit]] += weight * weights[found[hit]]
+            if exact:
+                continue
+            threshold = self._kth_score(scores, k)
+            if threshold > 0:
+                if candidates is None:
+                    candidates = np.flatnonzero(scores + remaining >= threshold - SCORE_TOLERANCE)
+                else:
+                    candidates = candidates[scores[candidates] + remaining >= threshold - SCORE_TOLERANCE]
+
+        threshold = 0.0 if exact else self._kth_score(scores, k)
+        rows = np.flatnonzero((scores > 0) & (scores >= threshold - SCORE_TOLERANCE))
+        if not len(rows):
+            return rows, np.array([])
+
+        # Rescore with the dense path's arithmetic so scores and ties match it exactly
+        exact_scores = cosine_similarity(query_vector, self.matrix[rows + start], dense_output=False).tocsr()
+        values = np.zeros(len(rows))
+        values[exact_scores.indices] = exact_scores.data
+        if row_mask is not None:
+            rows = (np.cumsum(row_mask) - 1)[rows]
+        return rows, values
+
+    @staticmethod
+    def _kth_score(scores, k):
+        """The ``k``-th highest score, or zero if there are fewer than ``k`` positive ones"""
+        if k <= 0 or k > len(scores):
+            return 0.0
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        return max(kth, 0.0)
@@ -0,0 +1,162 @@
+"""Precomputed nearest-neighbour graph of songs for "songs like this track".
+
+Recommendations only rank the matched singer's own tracks. The neighbour
+graph links every song to its ``k`` most similar songs anywhere in the
+catalog, by cosine similarity of the catalog-wide TF-IDF vectors
+(``RecommendationIndex.global_matrix``). By default songs by the same artist
+are left out, since shared artist names in the text would otherwise make them
+the closest matches.
+
+The graph is built offline in blocks of rows: each block is one sparse
+product against the transposed matrix, ranked and reduced to ``k`` entries
+per row before the next block starts, so memory is bounded by the block size
+rather than the catalog size squared. It is stored as an int32 matrix of
+dataframe positions (-1 pads songs with fewer than ``k`` neighbours) and a
+float32 matrix of scores, next to the recommendation index of the same
+dataset and memory-mapped on load. A query is then a row lookup.
+
+Build the graph for a catalog with::
+
+    python neighbor_graph.py songs.csv -k 20
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from ranking import top_k
+from recommendation_index import INDEX_DIR, index_path
+
+GRAPH_VERSION = 1
+DEFAULT_NEIGHBORS = 20
+BLOCK_SIZE = 512
+
+_loaded = {}
+
+
+class NeighborGraph:
+    """Top-k similar songs per dataframe position"""
+
+    def __init__(self, neighbors, scores, fingerprint, other_artists=True):
+        self.neighbors = neighbors
+        self.scores = scores
+        self.fingerprint = fingerprint
+        self.other_artists = other_artists
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    @classmethod
+    def build(cls, index, k=DEFAULT_NEIGHBORS, block_size=BLOCK_SIZE, other_artists=True):
+        """Compute each song's ``k`` nearest neighbours, ``block_size`` rows at a time
+
+        Equal scores are ranked in index row order, so the graph is deterministic.
+        """
+        matrix = index.global_matrix()
+        transposed = matrix.T.tocsr()
+        rows = matrix.shape[0]
+        offsets = index.artist_offsets
+        row_artist = np.repeat(np.arange(len(index.artist_keys)), np.diff(offsets))
+        neighbors = np.full((rows, k), -1, dtype=np.int32)
+        scores = np.zeros((rows, k), dtype=np.float32)
+
+        for start in range(0, rows, block_size):
+            stop = min(start + block_size, rows)
+            similarity = (matrix[start:stop] @ transposed).tocsr()
+            # With sorted columns, top_k ranks equal scores in row order
+            similarity.sort_indices()
+            for row in range(start, stop):
+                begin, end = similarity.indptr[row - start], similarity.indptr[row - start + 1]
+                columns = similarity.indices[begin:end]
+                values = similarity.data[begin:end]
+                if other_artists:
+                    artist = row_artist[row]
+                    keep = (columns < offsets[artist]) | (columns >= offsets[artist + 1])
+                else:
+                    keep = columns != row
+                keep &= values > 0
+                columns, values = columns[keep], values[keep]
+                top = top_k(values, k)
+                neighbors[row, :len(top)] = columns[top]
+                scores[row, :len(top)] = values[top]
+
+        # Rows and neighbours are in index order; store them by dataframe position
+        row_order = index.row_order
+        by_position = np.full((rows, k), -1, dtype=np.int32)
+        by_position[row_order] = np.where(neighbors >= 0, row_order[np.maximum(neighbors, 0)], -1)
+        position_scores = np.zeros((rows, k), dtype=np.float32)
+        position_scores[row_order] = scores
+        return cls(by_position, position_scores, index.fingerprint, other_artists)
+
+    def neighbors_of(self, position, n=None):
+        """Dataframe positions and scores of a song's ``n`` nearest neighbours, best first"""
+        row = self.neighbors[position, :n]
+        valid = row >= 0
+        return row[valid].astype(np.int64), self.scores[position, :n][valid]
+
+    def save(self, path):
+        """Write the graph to a directory"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'neighbors.npy'), self.neighbors)
+        np.save(os.path.join(path, 'scores.npy'), self.scores)
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': GRAPH_VERSION, 'fingerprint': self.fingerprint, 'k': self.k,
+                       'other_artists': self.other_artists}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Read a graph written by ``save``, memory-mapping its arrays by default"""
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != GRAPH_VERSION:
+            raise ValueError(f"Unsupported neighbour graph version {meta.get('version')}")
+        mmap_mode = 'r' if mmap else None
+        return cls(np.load(os.path.join(path, 'neighbors.npy'), mmap_mode=mmap_mode),
+                   np.load(os.path.join(path, 'scores.npy'), mmap_mode=mmap_mode),
+                   meta['fingerprint'], meta['other_artists'])
+
+
+def graph_path(fingerprint, directory=INDEX_DIR):
+    """Directory that holds the neighbour graph for a dataset fingerprint"""
+    return os.path.join(index_path(fingerprint, directory), 'neighbors')
+
+
+def load_neighbor_graph(fingerprint, directory=INDEX_DIR):
+    """The saved graph for a dataset, or None if it has not been built"""
+    path = graph_path(fingerprint, directory)
+    graph = _loaded.get(path)
+    if graph is None:
+        try:
+            graph = _loaded[path] = NeighborGraph.load(path)
+        except (OSError, ValueError, KeyError):
+            return None
+    return graph
+
+
+def main():
+    # catalog imports this module for Catalog.similar_songs
+    from catalog import open_catalog
+
+    parser = argparse.ArgumentParser(description='Build the song neighbour graph for a catalog')
+    parser.add_argument('catalog', help='CSV export or catalog bundle directory')
+    parser.add_argument('-k', type=int, default=DEFAULT_NEIGHBORS, help='neighbours kept per song')
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE, help='rows per sparse product')
+    parser.add_argument('--include-same-artist', action='store_true',
+                        help="also link songs to the same artist's songs")
+    args = parser.parse_args()
+
+    catalog = open_catalog(args.catalog)
+    start = time.perf_counter()
+    graph = NeighborGraph.build(catalog.index, args.k, args.block_size, not args.include_same_artist)
+    path = graph_path(graph.fingerprint)
+    graph.save(path)
+    linked = int((graph.neighbors[:, 0] >= 0).sum())
+    print(f"Linked {linked} of {len(graph.neighbors)} songs to up to {args.k} neighbours "
+          f"in {time.perf_counter() - start:.1f}s; wrote {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Top-k selection of recommendation scores.
+
+Only the best few of possibly tens of thousands of scored rows are shown, so
+instead of fully sorting every score the candidates are narrowed with
+``np.argpartition`` (linear time) and only those are sorted. Sparse score rows
+are ranked from their stored entries without densifying them.
+
+Rankings are deterministic: higher scores come first and equal scores keep
+their row order, including rows that score zero.
+"""
+import numpy as np
+
+
+def top_k(scores, k):
+    """Indices of the ``k`` highest scores, best first"""
+    scores = np.asarray(scores).ravel()
+    k = min(max(k, 0), len(scores))
+    if k == 0:
+        return np.array([], dtype=np.int64)
+
+    if k < len(scores):
+        threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        # Ties at the cut-off are taken in row order
+        tied = np.flatnonzero(scores == threshold)[:k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+
+def top_k_sparse(row, k):
+    """Indices of the ``k`` highest entries of a 1 x n sparse row, best first
+
+    Rows without a stored positive score rank after all positive ones, in row
+    order, exactly as ``top_k`` on the dense row would order them.
+    """
+    row = row.tocsr()
+    n = row.shape[1]
+    k = min(max(k, 0), n)
+    positive = row.data > 0
+    # Sorting by row keeps ties in row order
+    order = np.argsort(row.indices[positive], kind='stable')
+    indices = row.indices[positive][order]
+    values = row.data[positive][order]
+
+    best = indices[top_k(values, k)]
+    missing = k - len(best)
+    if missing > 0:
+        # The first k + len(indices) rows hold at least k rows without a positive score
+        zeros = np.setdiff1d(np.arange(min(n, k + len(indices))), indices, assume_unique=True)
+        best = np.concatenate([best, zeros[:missing]])
+    return best
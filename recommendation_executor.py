@@ -0,0 +1,131 @@
+"""Process-wide executor for recommendation requests.
+
+Streamlit sessions and service request threads all live in one process, and
+when a singer is trending many of them ask for the same recommendations at
+the same moment. Instead of computing on the caller's thread, requests go
+through one shared, bounded thread pool:
+
+- identical requests in flight are coalesced: the first one is computed and
+  every request with the same key waits for that computation
+- at most ``EXECUTOR_WORKERS`` computations run at once and at most
+  ``EXECUTOR_QUEUE_SIZE`` wait for a worker; beyond that new requests are
+  rejected with ``ExecutorBusy`` right away instead of queueing without bound
+- callers stop waiting after a timeout (``REQUEST_TIMEOUT_SECONDS`` by
+  default) and get ``TimeoutError``; the computation itself still finishes
+  for the other waiters and the result cache
+- ``stats`` reports queue depth, running and coalesced requests, rejections,
+  timeouts and queue wait times
+
+Keys are the ``result_cache`` keys (see ``Catalog.recommend_shared``).
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+EXECUTOR_WORKERS = int(os.environ.get('EXECUTOR_WORKERS', min(8, os.cpu_count() or 1)))
+EXECUTOR_QUEUE_SIZE = int(os.environ.get('EXECUTOR_QUEUE_SIZE', 64))
+# Callers wait at most this long unless they pass their own timeout
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get('REQUEST_TIMEOUT_SECONDS', 30))
+
+
+class ExecutorBusy(RuntimeError):
+    """Raised when the executor's queue is full"""
+
+
+class RecommendationExecutor:
+    """Bounded thread pool that coalesces identical in-flight requests"""
+
+    def __init__(self, workers=EXECUTOR_WORKERS, queue_size=EXECUTOR_QUEUE_SIZE, timeout=REQUEST_TIMEOUT_SECONDS,
+                 coalesce=True):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.coalesce = coalesce
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='recommend')
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.queued = 0
+        self.running = 0
+        self.peak_queued = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.completed = 0
+        self.queue_wait_seconds = 0.0
+
+    def submit(self, key, func):
+        """Future of ``func()``, shared with any request for the same key still in flight"""
+        with self._lock:
+            future = self._in_flight.get(key) if self.coalesce else None
+            if future is not None:
+                self.coalesced += 1
+                return future
+            if self.queued >= self.queue_size:
+                self.rejected += 1
+                raise ExecutorBusy(f"Too many requests are waiting ({self.queued}); try again shortly.")
+            self.submitted += 1
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            future = self._pool.submit(self._run, key, func, time.perf_counter())
+            if self.coalesce:
+                self._in_flight[key] = future
+        return future
+
+    def _run(self, key, func, submitted):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.queue_wait_seconds += time.perf_counter() - submitted
+        failed = True
+        try:
+            result = func()
+            failed = False
+            return result
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.failed += failed
+                # Later requests find the result in the cache
+                self._in_flight.pop(key, None)
+
+    def run(self, key, func, timeout=None):
+        """Result of ``func()`` computed on the pool, waiting at most ``timeout`` seconds
+
+        Raises ``ExecutorBusy`` if the queue is full and ``TimeoutError`` if
+        the result is not ready in time.
+        """
+        future = self.submit(key, func)
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"No recommendations within {timeout:g}s; try again shortly.") from None
+
+    def stats(self):
+        """Queue depth, in-flight work and counters"""
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'queued': self.queued,
+                'running': self.running,
+                'peak_queued': self.peak_queued,
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'completed': self.completed,
+                'failed': self.failed,
+                'mean_queue_wait_ms': round(self.queue_wait_seconds / started * 1000, 3) if started else None,
+            }
+
+
+recommendation_executor = RecommendationExecutor()
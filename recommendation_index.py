@@ -0,0 +1,359 @@
+"""Prebuilt TF-IDF recommendation index for the Hindi songs recommender.
+
+The index is built once per dataset and holds the global token vocabulary, a
+sparse CSR matrix of term counts with rows grouped by artist, and per-artist
+row slices. Queries only transform the search text and score it against the
+precomputed rows instead of refitting a ``TfidfVectorizer`` on every search.
+
+Two scoring modes are available:
+
+- ``exact`` (default) reproduces the per-singer fit of ``train_tfidf``: the
+  vocabulary, ``max_features`` cut-off and IDF weights are derived from the
+  singer's (optionally genre filtered) rows, but from the stored counts
+  rather than by re-tokenizing the text. Scores match the original path.
+- ``global`` scores against TF-IDF weights fitted once over the whole catalog.
+  It is cheaper still, but IDF weights and vocabulary reflect all artists, so
+  rankings can differ from the per-singer fit.
+- ``pruned`` ranks like ``global`` but, given the number of results wanted,
+  only scores the rows of large artists that can make the top ``k`` (see
+  ``inverted_index``). Its top ``k`` rows and scores equal ``global``'s.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from inverted_index import PRUNING_MIN_ROWS, InvertedIndex
+
+INDEX_VERSION = 2
+INDEX_DIR = os.environ.get('RECOMMENDATION_INDEX_DIR', '.recommendation_index')
+MAX_FEATURES = 1000
+STOP_WORDS = 'english'
+SCORING_MODES = ('exact', 'global', 'pruned')
+TEXT_COLUMNS = ['track_name', 'artist_name', 'album']
+
+
+def combined_text(df):
+    """Build the text that is vectorized for each song"""
+    track, artist, album = (df[col].fillna('').astype(str) for col in TEXT_COLUMNS)
+    return track + ' ' + artist + ' ' + album
+
+
+def artist_key(name):
+    """Normalize an artist name the way recommendations filter on it"""
+    return str(name).lower()
+
+
+def dataset_fingerprint(df):
+    """Hash the columns the index is built from"""
+    columns = [col for col in TEXT_COLUMNS if col in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns].fillna(''), index=False).values
+    digest = hashlib.sha1(hashes.tobytes())
+    digest.update(str(INDEX_VERSION).encode())
+    return digest.hexdigest()
+
+
+class RecommendationIndex:
+    """Global vocabulary, artist-grouped count matrix and per-artist slices"""
+
+    def __init__(self, vocabulary, counts, artist_keys, artist_offsets, row_order, fingerprint):
+        self.vocabulary = list(vocabulary)
+        self.counts = counts.tocsr()
+        self.artist_keys = list(artist_keys)
+        self.artist_offsets = np.asarray(artist_offsets, dtype=np.int64)
+        self.row_order = np.asarray(row_order, dtype=np.int64)
+        self.fingerprint = fingerprint
+        self._artist_lookup = {key: i for i, key in enumerate(self.artist_keys)}
+        self._vectorizer = CountVectorizer(stop_words=STOP_WORDS, vocabulary=self.vocabulary)
+        self._global_tfidf = None
+        self._global_matrix = None
+        self._inverted_index = None
+
+    @classmethod
+    def build(cls, df):
+        """Tokenize the catalog once and group its rows by artist"""
+        keys = df['artist_name'].fillna('').astype(str).str.lower().to_numpy()
+        # Stable sort keeps each artist's rows in their original order
+        row_order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[row_order]
+        artist_keys, starts = np.unique(sorted_keys, return_index=True)
+        artist_offsets = np.append(starts, len(sorted_keys))
+
+        vocabulary, counts = _count_terms(combined_text(df).to_numpy()[row_order])
+
+        return cls(vocabulary, counts, artist_keys.tolist(), artist_offsets, row_order,
+                   dataset_fingerprint(df))
+
+    def extended(self, df, start):
+        """Index for ``df``, whose rows from ``start`` on were appended to this index's catalog
+
+        Only the new rows are tokenized. Existing rows keep their counts, with
+        term columns renumbered when new terms join the vocabulary, and the new
+        rows are slotted in after their artist's existing rows. The result is
+        identical to ``build(df)``.
+        """
+        new_rows = df.iloc[start:]
+        new_vocabulary, new_counts = _count_terms(combined_text(new_rows).to_numpy())
+        vocabulary = sorted(set(self.vocabulary).union(new_vocabulary))
+        columns = {term: i for i, term in enumerate(vocabulary)}
+        old_columns = np.array([columns[term] for term in self.vocabulary], dtype=np.int32)
+        new_columns = np.array([columns[term] for term in new_vocabulary], dtype=np.int32)
+        counts = sparse.csr_matrix((
+            np.concatenate([self.counts.data, new_counts.data]),
+            np.concatenate([old_columns[self.counts.indices], new_columns[new_counts.indices]]),
+            np.concatenate([self.counts.indptr, new_counts.indptr[1:] + self.counts.nnz]),
+        ), shape=(self.counts.shape[0] + new_counts.shape[0], len(vocabulary)))
+
+        new_keys = new_rows['artist_name'].fillna('').astype(str).str.lower().to_numpy()
+        artist_keys = sorted(set(self.artist_keys).union(new_keys))
+        codes = {key: i for i, key in enumerate(artist_keys)}
+        old_codes = np.array([codes[key] for key in self.artist_keys], dtype=np.int64)
+        row_codes = np.concatenate([np.repeat(old_codes, np.diff(self.artist_offsets)),
+                                    np.array([codes[key] for key in new_keys], dtype=np.int64)])
+        # The existing rows are already grouped, so this stable sort only has to merge in the new ones
+        order = np.argsort(row_codes, kind='stable')
+        row_order = np.concatenate([self.row_order, np.arange(start, len(df))])[order]
+        artist_offsets = np.searchsorted(row_codes[order], np.arange(len(artist_keys) + 1))
+
+        return RecommendationIndex(vocabulary, counts[order], artist_keys, artist_offsets, row_order,
+                                   dataset_fingerprint(df))
+
+    def save(self, path):
+        """Write the index to a directory"""
+        os.makedirs(path, exist_ok=True)
+        # Plain .npy files so the arrays can be memory-mapped on load
+        for name, array in (('data', self.counts.data), ('indices', self.counts.indices),
+                            ('indptr', self.counts.indptr), ('artist_offsets', self.artist_offsets),
+                            ('row_order', self.row_order)):
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'fingerprint': self.fingerprint,
+                'vocabulary': self.vocabulary,
+                'artist_keys': self.artist_keys,
+                'shape': list(self.counts.shape),
+            }, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Read an index written by ``save``, memory-mapping its arrays by default"""
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {meta.get('version')}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                  for name in ('data', 'indices', 'indptr', 'artist_offsets', 'row_order')}
+        counts = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                                   shape=tuple(meta['shape']), copy=False)
+        return cls(meta['vocabulary'], counts, meta['artist_keys'],
+                   arrays['artist_offsets'], arrays['row_order'], meta['fingerprint'])
+
+    def artist_slice(self, artist):
+        """Return the (start, stop) rows of an artist in the count matrix"""
+        position = self._artist_lookup.get(artist_key(artist))
+        if position is None:
+            return 0, 0
+        return int(self.artist_offsets[position]), int(self.artist_offsets[position + 1])
+
+    def artist_rows(self, artist):
+        """Return the dataframe row positions of an artist, in catalog order"""
+        start, stop = self.artist_slice(artist)
+        return self.row_order[start:stop]
+
+    def score(self, query, artist, row_mask=None, scoring='exact'):
+        """Score a query against an artist's rows
+
+        ``row_mask`` optionally restricts the artist's rows (e.g. to a genre) and
+        is aligned with ``artist_rows(artist)``. Returns the dataframe positions
+        of the scored rows and their cosine similarities.
+        """
+        positions, similarity = self.score_many([query], artist, row_mask, scoring)
+        return positions, similarity[0]
+
+    def score_many(self, queries, artist, row_mask=None, scoring='exact', dense_output=True, k=None):
+        """Score several queries against the same artist rows in one sparse product
+
+        Returns the dataframe positions of the scored rows and a
+        ``(len(queries), len(positions))`` array of cosine similarities, or a
+        sparse matrix holding only the non-zero ones with ``dense_output=False``.
+        With ``pruned`` scoring and ``k``, rows of large artists that cannot
+        rank among a query's best ``k`` may be left at zero.
+        """
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode '{scoring}'. Use one of: {', '.join(SCORING_MODES)}")
+
+        start, stop = self.artist_slice(artist)
+        positions = self.row_order[start:stop]
+        if row_mask is not None:
+            row_mask = np.asarray(row_mask, dtype=bool)
+            positions = positions[row_mask]
+
+        query_counts = self._vectorizer.transform(list(queries))
+
+        if scoring == 'pruned' and k is not None and stop - start >= PRUNING_MIN_ROWS:
+            tfidf, _ = self._global_weights()
+            similarity = self._score_pruned(tfidf.transform(query_counts), artist, row_mask, k, len(positions))
+            return positions, similarity.toarray() if dense_output else similarity
+
+        if scoring in ('global', 'pruned'):
+            tfidf, matrix = self._global_weights()
+            rows = matrix[start:stop]
+            if row_mask is not None:
+                rows = rows[row_mask]
+            query_vectors = tfidf.transform(query_counts)
+            return positions, cosine_similarity(query_vectors, rows, dense_output=dense_output)
+
+        rows = self.counts[start:stop]
+        if row_mask is not None:
+            rows = rows[row_mask]
+        tfidf, matrix, columns = _fit_subset(rows)
+        query_vectors = tfidf.transform(_select_columns(query_counts, columns))
+        return positions, cosine_similarity(query_vectors, matrix, dense_output=dense_output)
+
+    def _score_pruned(self, query_vectors, artist, row_mask, k, columns):
+        """Sparse similarities of the rows ``InvertedIndex.search`` scores for each query"""
+        inverted = self.inverted_index()
+        position = self._artist_lookup[artist_key(artist)]
+        data, indices, indptr = [], [], [0]
+        for i in range(query_vectors.shape[0]):
+            rows, scores = inverted.search(query_vectors[i], position, k, row_mask)
+            indices.append(rows)
+            data.append(scores)
+            indptr.append(indptr[-1] + len(rows))
+        return sparse.csr_matrix((np.concatenate(data), np.concatenate(indices), indptr),
+                                 shape=(query_vectors.shape[0], columns))
+
+    def inverted_index(self):
+        """Block-max postings over ``global_matrix``, built on first use"""
+        if self._inverted_index is None:
+            self._inverted_index = InvertedIndex(self.global_matrix(), self.artist_offsets)
+        return self._inverted_index
+
+    def global_matrix(self):
+        """L2-normalized TF-IDF rows fitted over the whole catalog, in index row order"""
+        return self._global_weights()[1]
+
+    def global_vectors(self, queries):
+        """L2-normalized TF-IDF vectors of search texts, comparable with ``global_matrix`` rows"""
+        tfidf, _ = self._global_weights()
+        return tfidf.transform(self._vectorizer.transform(list(queries)))
+
+    def _global_weights(self):
+        """Fit TF-IDF weights over the whole catalog once, on first use"""
+        if self._global_matrix is None:
+            tfidf = TfidfTransformer()
+            self._global_matrix = tfidf.fit_transform(_as_float(self.counts))
+            self._global_tfidf = tfidf
+        return self._global_tfidf, self._global_matrix
+
+
+def _count_terms(documents):
+    """Count tokens per document with an alphabetically ordered vocabulary
+
+    Unlike ``CountVectorizer.fit_transform`` each row keeps its entries in the
+    order the terms first occur in the document, which ``_fit_subset`` needs
+    to lay out a subset exactly like a fresh fit over it.
+    """
+    analyzer = CountVectorizer(stop_words=STOP_WORDS).build_analyzer()
+    term_ids = {}
+    indices = []
+    values = []
+    indptr = [0]
+    for document in documents:
+        document_counts = {}
+        for term in analyzer(document):
+            term_id = term_ids.setdefault(term, len(term_ids))
+            document_counts[term_id] = document_counts.get(term_id, 0) + 1
+        indices.extend(document_counts.keys())
+        values.extend(document_counts.values())
+        indptr.append(len(indices))
+
+    vocabulary = sorted(term_ids)
+    remap = np.empty(len(term_ids), dtype=np.int32)
+    for position, term in enumerate(vocabulary):
+        remap[term_ids[term]] = position
+    indices = remap[np.asarray(indices, dtype=np.int64)]
+    counts = sparse.csr_matrix((np.asarray(values, dtype=np.int64), indices, np.asarray(indptr, dtype=np.int64)),
+                               shape=(len(indptr) - 1, len(vocabulary)))
+    return vocabulary, counts
+
+
+def _fit_subset(counts):
+    """Reproduce ``TfidfVectorizer(max_features=MAX_FEATURES).fit_transform`` from counts
+
+    The returned matrix matches a fresh fit down to the order of the stored
+    entries, so floating point sums and therefore tie-breaking in the ranking
+    are identical to ``train_tfidf``.
+    """
+    # Vocabulary columns are sorted alphabetically, as in a fresh fit
+    columns, first_seen = np.unique(counts.indices, return_index=True)
+    if len(columns) == 0:
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+    counts = _select_columns(counts, columns)
+
+    # A fresh fit stores each row's entries in the order terms were first seen in the subset
+    row_ids = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+    order = np.lexsort((first_seen[counts.indices], row_ids))
+    counts = sparse.csr_matrix((counts.data[order], counts.indices[order], counts.indptr),
+                               shape=counts.shape)
+
+    if len(columns) > MAX_FEATURES:
+        term_frequency = np.asarray(counts.sum(axis=0)).ravel()
+        keep = np.sort((-term_frequency).argsort()[:MAX_FEATURES])
+        columns = columns[keep]
+        counts = _select_columns(counts, keep)
+
+    tfidf = TfidfTransformer()
+    matrix = tfidf.fit_transform(counts)
+    return tfidf, matrix, columns
+
+
+def _as_float(matrix):
+    """Convert CSR counts to float64 without reordering the stored entries"""
+    return sparse.csr_matrix((matrix.data.astype(np.float64), matrix.indices.copy(), matrix.indptr.copy()),
+                             shape=matrix.shape)
+
+
+def _select_columns(matrix, columns):
+    """Select sorted CSR columns, keeping each row's entries in their stored order
+
+    scipy's column indexing may reorder the entries of a row, which changes
+    floating point summation order compared to a fresh ``TfidfVectorizer`` fit.
+    """
+    remap = np.full(matrix.shape[1], -1, dtype=np.int64)
+    remap[columns] = np.arange(len(columns))
+    new_indices = remap[matrix.indices]
+    keep = new_indices >= 0
+    row_ids = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    row_counts = np.bincount(row_ids[keep], minlength=matrix.shape[0])
+    indptr = np.concatenate([[0], np.cumsum(row_counts)])
+    return sparse.csr_matrix((matrix.data[keep].astype(np.float64), new_indices[keep], indptr),
+                             shape=(matrix.shape[0], len(columns)))
+
+
+def index_path(fingerprint, directory=INDEX_DIR):
+    """Directory that holds the index for a dataset fingerprint"""
+    return os.path.join(directory, fingerprint)
+
+
+def load_or_build_index(df, directory=INDEX_DIR):
+    """Load the saved index for this dataset, building and saving it if missing"""
+    path = index_path(dataset_fingerprint(df), directory)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        try:
+            return RecommendationIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            pass
+    index = RecommendationIndex.build(df)
+    try:
+        index.save(path)
+    except OSError:
+        # A read-only deployment still gets the in-memory index
+        pass
+    return index
@@ -0,0 +1,393 @@
+"""Local HTTP/JSON recommendation service.
+
+The catalog and its indexes are loaded once when the service starts and stay
+warm in memory; each request only resolves the singer and scores that artist's
+rows. Requests are served concurrently on a thread per connection (scoring
+spends most of its time in NumPy and SciPy code).
+
+Endpoints:
+
+- ``GET /recommendations?singer=...&genre=...&n=10`` or ``POST /recommendations``
+  with a JSON body ``{"singer": ..., "genre": ..., "n": ...}``: a structured
+  result with the matched singer, genre counts, error and songs
+- ``GET /catalog``: song, artist, album and genre counts and the genre list
+- ``POST /catalog/delta`` with a CSV body: append its new tracks (see
+  ``catalog_update``); requests in flight finish on the previous catalog
+- ``GET /health``: liveness, catalog version and fingerprint, and uptime
+- ``GET /metrics``: request counts, latency percentiles over recent requests,
+  delta counts, result/singer cache counters and executor queue metrics
+- ``GET /metrics/prometheus``: stage timings and counters (see
+  ``instrumentation``), cache counters and executor queue metrics in
+  Prometheus text format
+
+Recommendations that are not cached are computed on the process-wide
+``recommendation_executor``, which coalesces identical concurrent requests.
+When its queue is full a request gets ``503`` with ``Retry-After``; when the
+result takes longer than the request timeout, ``504``. Any other failure is
+logged, counted as an error in the metrics and answered with a JSON ``500``.
+
+Adding ``profile=cprofile`` or ``profile=sampling`` to a recommendation request
+computes it without the result cache under that profiler and adds the report
+to the response.
+
+Run it next to the Streamlit app and point the app at it with
+``RECOMMENDATION_SERVICE_URL``::
+
+    python recommendation_service.py catalog_bundle/ --port 8765
+    RECOMMENDATION_SERVICE_URL=http://127.0.0.1:8765 streamlit run streamlit_hindi_songs_app.py
+
+The app talks to it through ``service_client.RecommendationClient``.
+"""
+import argparse
+import io
+import json
+import threading
+import time
+import traceback
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from catalog import open_catalog
+from catalog_ingest import ingest_csv
+from catalog_store import current_snapshot
+from catalog_update import apply_delta, publish_catalog
+from instrumentation import PROFILE_MODES, enable, profile_request, prometheus_text
+from recommendation_executor import ExecutorBusy, recommendation_executor
+from recommendation_index import SCORING_MODES
+from result_cache import result_cache, singer_cache
+from service_client import DEFAULT_RECOMMENDATIONS, MAX_RECOMMENDATIONS, RecommendationClient  # noqa: F401
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+LATENCY_WINDOW = 10_000
+PERCENTILES = (50, 90, 95, 99)
+
+
+class LatencyTracker:
+    """Request counts and latencies of the most recent requests"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds, failed=False):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.requests += 1
+            self.errors += failed
+
+    def snapshot(self):
+        """Counts and latency percentiles in milliseconds"""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            requests, errors = self.requests, self.errors
+        percentiles = {}
+        if len(latencies):
+            values = np.percentile(latencies, PERCENTILES)
+            percentiles = {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, values)}
+            percentiles['max'] = round(float(latencies.max()), 3)
+        return {'requests': requests, 'errors': errors, 'window': len(latencies), 'latency_ms': percentiles}
+
+
+class RecommendationService:
+    """A loaded catalog and the request metrics of the service serving it
+
+    The catalog, its summary and version are replaced together as one tuple,
+    so a request always reads a consistent catalog version. With a
+    ``snapshot_root``, applied deltas are also published as snapshots there.
+    """
+
+    def __init__(self, catalog, scoring='exact', snapshot_root=None):
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode '{scoring}'. Use one of: {', '.join(SCORING_MODES)}")
+        self.scoring = scoring
+        self.snapshot_root = snapshot_root
+        self.started = time.time()
+        self.metrics = LatencyTracker()
+        self.delta_metrics = LatencyTracker()
+        version = current_snapshot(snapshot_root) if snapshot_root else None
+        self._state = (version or 1, catalog, catalog.summary())
+        self._update_lock = threading.Lock()
+
+    @property
+    def catalog(self):
+        return self._state[1]
+
+    @property
+    def version(self):
+        return self._state[0]
+
+    def warm_up(self):
+        """Run one query so lazily built scoring state exists before serving"""
+        catalog = self.catalog
+        if self.scoring == 'pruned':
+            catalog.index.inverted_index()
+        if catalog.artist_index.artists:
+            catalog.recommend(catalog.artist_index.artists[0], 1, scoring=self.scoring)
+
+    def apply_delta(self, source):
+        """Append the new tracks of a delta CSV and switch requests to the updated catalog"""
+        start = time.perf_counter()
+        try:
+            delta, _ = ingest_csv(source)
+            with self._update_lock:
+                version, catalog, _ = self._state
+                catalog, report = apply_delta(catalog, delta)
+                if report['rows_added']:
+                    if self.snapshot_root:
+                        version = publish_catalog(catalog, self.snapshot_root)
+                    else:
+                        version += 1
+                    self._state = (version, catalog, catalog.summary())
+        except Exception:
+            self.delta_metrics.record(time.perf_counter() - start, failed=True)
+            raise
+        self.delta_metrics.record(time.perf_counter() - start)
+        return {'version': version, **report}
+
+    def recommend(self, singer, num_recommendations=DEFAULT_RECOMMENDATIONS, genre_filter=None, profile=None):
+        """Structured recommendations for one request, optionally profiled with a ``PROFILE_MODES`` profiler"""
+        start = time.perf_counter()
+        try:
+            if profile:
+                with profile_request(profile) as capture:
+                    result = self.catalog.recommend(singer, num_recommendations, genre_filter or None, self.scoring,
+                                                    use_cache=False)
+            else:
+                result = self.catalog.recommend_shared(singer, num_recommendations, genre_filter or None,
+                                                       self.scoring)
+        except Exception:
+            self.metrics.record(time.perf_counter() - start, failed=True)
+            raise
+        seconds = time.perf_counter() - start
+        self.metrics.record(seconds, failed=result.error is not None)
+        response = {
+            'query': singer,
+            'genre_filter': genre_filter or None,
+            'num_recommendations': num_recommendations,
+            **result.to_dict(),
+            'latency_ms': round(seconds * 1000, 3),
+        }
+        if profile:
+            response['profile'] = capture['report']
+        return response
+
+    def prometheus_text(self):
+        """Instrumentation and cache counters in Prometheus text format"""
+        lines = [prometheus_text().rstrip('\n')]
+        for metric in ('requests', 'errors'):
+            lines.append(f"# TYPE recommender_{metric}_total counter")
+            for endpoint, tracker in (('recommendations', self.metrics), ('delta', self.delta_metrics)):
+                lines.append(f'recommender_{metric}_total{{endpoint="{endpoint}"}} {getattr(tracker, metric)}')
+        for metric, key in (('hits', 'hits'), ('misses', 'misses'), ('evictions', 'evictions')):
+            lines.append(f"# TYPE recommender_cache_{metric}_total counter")
+            for name, cache in (('results', result_cache), ('singers', singer_cache)):
+                lines.append(f'recommender_cache_{metric}_total{{cache="{name}"}} {cache.stats()[key]}')
+        executor = recommendation_executor.stats()
+        for metric in ('queued', 'running'):
+            lines.append(f"# TYPE recommender_executor_{metric} gauge")
+            lines.append(f"recommender_executor_{metric} {executor[metric]}")
+        for metric in ('submitted', 'coalesced', 'rejected', 'timeouts', 'failed'):
+            lines.append(f"# TYPE recommender_executor_{metric}_total counter")
+            lines.append(f"recommender_executor_{metric}_total {executor[metric]}")
+        return '\n'.join(lines) + '\n'
+
+    def health(self):
+        version, catalog, summary = self._state
+        return {
+            'status': 'ok',
+            'version': version,
+            'songs': summary['songs'],
+            'fingerprint': catalog.index.fingerprint,
+            'scoring': self.scoring,
+            'uptime_seconds': round(time.time() - self.started, 1),
+        }
+
+    def summary(self):
+        return self._state[2]
+
+
+def _optional_string(params, name):
+    """A string parameter, or None when it is absent or empty"""
+    value = params.get(name)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"'{name}' must be a string")
+    return value or None
+
+
+def _parse_count(value):
+    """``n`` as an int; JSON integers and decimal digit strings are accepted, booleans are not"""
+    if value is None or value == '':
+        return DEFAULT_RECOMMENDATIONS
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isascii() and value.strip().isdecimal():
+        return int(value)
+    raise ValueError("'n' must be an integer")
+
+
+def _parse_request(params):
+    """Validate ``singer``, ``genre``, ``n`` and ``profile`` request parameters"""
+    singer = (_optional_string(params, 'singer') or '').strip()
+    if not singer:
+        raise ValueError("'singer' is required")
+    profile = _optional_string(params, 'profile')
+    if profile is not None and profile not in PROFILE_MODES:
+        raise ValueError(f"'profile' must be one of: {', '.join(PROFILE_MODES)}")
+    num_recommendations = _parse_count(params.get('n'))
+    if not 1 <= num_recommendations <= MAX_RECOMMENDATIONS:
+        raise ValueError(f"'n' must be between 1 and {MAX_RECOMMENDATIONS}")
+    return singer, num_recommendations, _optional_string(params, 'genre'), profile
+
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's ``RecommendationService``"""
+
+    server_version = 'HindiSongsRecommender/1.0'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        service = self.server.service
+        if url.path == '/recommendations':
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            self._recommend(params)
+        elif url.path == '/health':
+            self._send_json(200, service.health())
+        elif url.path == '/metrics':
+            self._send_json(200, {**service.metrics.snapshot(),
+                                  'deltas': service.delta_metrics.snapshot(),
+                                  'caches': {'results': result_cache.stats(), 'singers': singer_cache.stats()},
+                                  'executor': recommendation_executor.stats()})
+        elif url.path == '/metrics/prometheus':
+            self._send_text(200, service.prometheus_text())
+        elif url.path == '/catalog':
+            self._send_json(200, service.summary())
+        else:
+            self._send_json(404, {'error': f"Unknown path '{url.path}'"})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == '/catalog/delta':
+            self._apply_delta()
+            return
+        if path != '/recommendations':
+            self._send_json(404, {'error': f"Unknown path '{self.path}'"})
+            return
+        try:
+            params = json.loads(self._read_body() or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': 'Request body must be JSON'})
+            return
+        if not isinstance(params, dict):
+            self._send_json(400, {'error': 'Request body must be a JSON object'})
+            return
+        self._recommend(params)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _apply_delta(self):
+        try:
+            report = self.server.service.apply_delta(io.BytesIO(self._read_body()))
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {'error': f"Could not apply the delta CSV: {e}"})
+            return
+        except Exception:
+            self._internal_error()
+            return
+        self._send_json(200, report)
+
+    def _recommend(self, params):
+        try:
+            singer, num_recommendations, genre_filter, profile = _parse_request(params)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        try:
+            response = self.server.service.recommend(singer, num_recommendations, genre_filter, profile)
+        except ExecutorBusy as e:
+            self._send_json(503, {'error': str(e)}, {'Retry-After': '1'})
+            return
+        except TimeoutError as e:
+            self._send_json(504, {'error': str(e)})
+            return
+        except Exception:
+            self._internal_error()
+            return
+        self._send_json(200, response)
+
+    def _internal_error(self):
+        """Log the exception being handled and answer with a JSON 500"""
+        self.log_error("%s %s failed", self.command, self.path)
+        # log_message escapes line breaks, so the traceback is written directly
+        traceback.print_exc()
+        self._send_json(500, {'error': 'Internal server error'})
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload, ensure_ascii=False), 'application/json; charset=utf-8', headers)
+
+    def _send_text(self, status, text):
+        self._send(status, text, 'text/plain; version=0.0.4; charset=utf-8')
+
+    def _send(self, status, text, content_type, headers=None):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def log_error(self, format, *args):
+        # Errors are logged even with --quiet
+        super().log_message(format, *args)
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, quiet=False):
+    """HTTP server for a service; call ``serve_forever`` to run it"""
+    server = ThreadingHTTPServer((host, port), RecommendationHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve song recommendations over HTTP')
+    parser.add_argument('catalog', help='CSV export, catalog bundle or snapshot directory')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--scoring', default='exact', choices=SCORING_MODES)
+    parser.add_argument('--quiet', action='store_true', help='do not log every request')
+    parser.add_argument('--instrument', action='store_true', help='record stage timings (see instrumentation.py)')
+    args = parser.parse_args()
+
+    if args.instrument:
+        enable()
+    snapshot_root = args.catalog if current_snapshot(args.catalog) is not None else None
+    service = RecommendationService(open_catalog(args.catalog), args.scoring, snapshot_root)
+    service.warm_up()
+    server = make_server(service, args.host, args.port, args.quiet)
+    print(f"Serving {service.summary()['songs']} songs on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
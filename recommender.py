@@ -0,0 +1,224 @@
+"""Recommendation logic shared by the Streamlit app and the batch tools.
+
+Nothing here imports Streamlit, so it can be used from scripts, services and
+worker processes.
+"""
+from collections import namedtuple
+
+import pandas as pd
+from fuzzywuzzy import process
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from instrumentation import increment, stage, timed
+from ranking import top_k, top_k_sparse
+from recommendation_index import combined_text
+
+DISPLAY_COLUMNS = ['track_name', 'artist_name', 'album', 'genre']
+SPOTIFY_TRACK_URL = 'https://open.spotify.com/track/'
+
+
+class Recommendation(namedtuple('Recommendation', ['recommendations', 'error', 'matched_singer', 'genre_counts'])):
+    """Result of a recommendation request
+
+    ``recommendations`` is a dataframe of songs (empty on error), ``error`` a
+    message or None, ``matched_singer`` the catalog artist the input resolved
+    to and ``genre_counts`` that artist's song count per genre.
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        """JSON-ready form of the result"""
+        return {
+            'matched_singer': self.matched_singer,
+            'error': self.error,
+            'genre_counts': dict(self.genre_counts),
+            'recommendations': self.recommendations.to_dict('records'),
+        }
+
+    def copy(self):
+        """Copy of the result whose frame and genre counts the caller may modify"""
+        return self._replace(recommendations=self.recommendations.copy(), genre_counts=dict(self.genre_counts))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a result from ``to_dict`` output"""
+        return cls(pd.DataFrame.from_records(data['recommendations']), data['error'], data['matched_singer'],
+                   data['genre_counts'])
+
+
+@timed('find_closest_singer')
+def find_closest_singer(user_input, df, artist_index=None):
+    """Find the closest matching singer using fuzzy matching"""
+    if artist_index is not None:
+        return artist_index.lookup(user_input)
+
+    singers = df['artist_name'].unique().tolist()
+    singers = [singer for singer in singers if singer.strip()]  # Remove empty strings
+
+    if not singers:
+        return None
+
+    best_match = process.extractOne(user_input, singers, score_cutoff=60)
+    if best_match:
+        return best_match[0]
+    return None
+
+
+@timed('get_singer_genres')
+def get_singer_genres(singer, df, row_index=None):
+    """Get genres for a specific singer"""
+    if singer and row_index is not None:
+        genre_counts = row_index.genre_counts(singer)
+        return sorted(genre_counts.keys()), genre_counts
+    if singer:
+        singer_songs = df[df['artist_name'].str.lower() == singer.lower()]
+        if not singer_songs.empty:
+            genre_counts = singer_songs['genre'].value_counts().to_dict()
+            return sorted(genre_counts.keys()), genre_counts
+    return [], {}
+
+
+@timed('train_tfidf')
+def train_tfidf(df):
+    """Train TF-IDF vectorizer"""
+    tfidf = TfidfVectorizer(stop_words='english', max_features=1000)
+    vectorizer = tfidf.fit_transform(combined_text(df))
+    return tfidf, vectorizer
+
+
+def check_request(user_input, df, genre_filter=None, artist_index=None, row_index=None):
+    """Match the singer and validate the genre filter
+
+    Returns ``(matched_singer, genre_counts, error)``; ``error`` is None when
+    recommendations can be computed.
+    """
+    matched_singer = find_closest_singer(user_input, df, artist_index)
+
+    if not matched_singer:
+        return None, {}, "No close matches found for the singer. Please check your input."
+
+    singer_genres, genre_counts = get_singer_genres(matched_singer, df, row_index)
+
+    if not singer_genres:
+        return matched_singer, {}, f"No genres found for singer '{matched_singer}'."
+
+    unique_genres = row_index.genres if row_index is not None else sorted(df['genre'].unique().tolist())
+    return matched_singer, genre_counts, check_genre_filter(matched_singer, genre_counts, genre_filter, unique_genres)
+
+
+def check_genre_filter(matched_singer, genre_counts, genre_filter, unique_genres):
+    """Return an error if the genre filter is unknown or not sung by the singer"""
+    singer_genres = sorted(genre_counts.keys())
+
+    if genre_filter and genre_filter not in unique_genres:
+        return f"Invalid genre '{genre_filter}'. Available genres: {', '.join(unique_genres)}"
+
+    if genre_filter and genre_filter not in singer_genres:
+        return f"Genre '{genre_filter}' not associated with '{matched_singer}'. Singer's genres: {', '.join(singer_genres)}"
+
+    return None
+
+
+def format_duration(ms):
+    """Format a duration in milliseconds as m:ss"""
+    if pd.isnull(ms):
+        return "0:00"
+    return f"{int(ms // 60000)}:{int((ms % 60000) / 1000):02d}"
+
+
+def spotify_link(track_id):
+    """Spotify web player URL of a track ID, or an empty string"""
+    return f"{SPOTIFY_TRACK_URL}{track_id}" if track_id else ""
+
+
+def display_songs(songs):
+    """Frame shown for catalog rows: text columns, formatted duration and Spotify link
+
+    The catalog keeps durations in milliseconds and bare Spotify track IDs, so
+    they are only formatted for the rows that are shown. Frames that already
+    carry ``formatted_duration`` or ``spotify_link`` columns keep them.
+    """
+    display = pd.DataFrame({col: songs[col].to_numpy(dtype=object) for col in DISPLAY_COLUMNS}, index=songs.index)
+    if 'duration' in songs.columns:
+        display['formatted_duration'] = [format_duration(ms) for ms in songs['duration']]
+    elif 'formatted_duration' in songs.columns:
+        display['formatted_duration'] = songs['formatted_duration']
+    if 'spotify_id' in songs.columns:
+        display['spotify_link'] = [spotify_link(track_id) for track_id in songs['spotify_id']]
+    elif 'spotify_link' in songs.columns:
+        display['spotify_link'] = songs['spotify_link']
+    return display
+
+
+@timed('get_recommendations')
+def get_recommendations(user_input, df, num_recommendations=10, genre_filter=None, index=None, scoring='exact',
+                        artist_index=None, row_index=None):
+    """Get song recommendations based on singer and optional genre filter
+
+    When a prebuilt ``RecommendationIndex`` is given, the query is scored against
+    its precomputed rows instead of refitting TF-IDF. ``scoring`` selects the
+    index scoring mode (see ``recommendation_index``). A prebuilt
+    ``ArtistIndex`` speeds up singer matching and a ``RowIndex`` replaces the
+    full-catalog artist and genre scans. Songs are ranked by score, equal
+    scores in catalog order.
+
+    Returns a ``Recommendation``; on failure its ``error`` is set and the
+    recommendations are empty.
+    """
+    matched_singer, genre_counts, error = check_request(user_input, df, genre_filter, artist_index, row_index)
+
+    if error:
+        increment('recommendation_errors')
+        return Recommendation(pd.DataFrame(), error, matched_singer, genre_counts)
+
+    # Filter songs by singer
+    with stage('filter_rows'):
+        if row_index is not None:
+            df_filtered = df.iloc[row_index.artist_rows(matched_singer)]
+        else:
+            df_filtered = df[df['artist_name'].str.lower() == matched_singer.lower()]
+
+    if df_filtered.empty:
+        return Recommendation(pd.DataFrame(), f"No songs found for '{matched_singer}'.", matched_singer,
+                              genre_counts)
+
+    # Apply genre filter if specified
+    if genre_filter:
+        with stage('filter_rows'):
+            if row_index is not None:
+                df_filtered = df.iloc[row_index.artist_genre_rows(matched_singer, genre_filter)]
+            else:
+                df_filtered = df_filtered[df_filtered['genre'] == genre_filter]
+        if df_filtered.empty:
+            return Recommendation(pd.DataFrame(), f"No songs found for '{matched_singer}' in genre '{genre_filter}'.",
+                                  matched_singer, genre_counts)
+
+    combined_query = f"{matched_singer} {user_input}"
+    if index is not None:
+        # Score against the prebuilt index rows
+        positions = index.artist_rows(matched_singer)
+        row_mask = df['genre'].iloc[positions].to_numpy() == genre_filter if genre_filter else None
+        with stage('score'):
+            positions, user_similarity = index.score_many([combined_query], matched_singer, row_mask, scoring,
+                                                          dense_output=False, k=num_recommendations)
+        with stage('rank'):
+            similar_indices = top_k_sparse(user_similarity, num_recommendations)
+        recommendations = df.iloc[positions[similar_indices]]
+    else:
+        # Train TF-IDF and get recommendations
+        tfidf, vectorizer = train_tfidf(df_filtered)
+        with stage('score'):
+            user_vector = tfidf.transform([combined_query])
+            user_similarity = cosine_similarity(user_vector, vectorizer)
+
+        # Get top recommendations
+        with stage('rank'):
+            similar_indices = top_k(user_similarity[0], num_recommendations)
+        recommendations = df_filtered.iloc[similar_indices]
+
+    # Format the selected songs for display
+    recommendations = display_songs(recommendations)
+
+    increment('recommendations')
+    return Recommendation(recommendations, None, matched_singer, genre_counts)
@@ -0,0 +1,111 @@
+"""In-memory caches for repeated recommendation requests.
+
+Most traffic asks for the same few hundred singers, often with the same
+misspellings. Two process-wide caches skip the repeated work:
+
+- ``result_cache`` holds finished recommendations, keyed on the catalog
+  version (a hash of every column, see ``catalog.catalog_version``), scoring
+  mode, normalized input, genre filter and number of recommendations (see
+  ``Catalog.recommend``)
+- ``singer_cache`` holds the artist a raw input resolves to, keyed on the
+  artist index fingerprint and lookup settings (see ``ArtistIndex.lookup``)
+
+Because the keys include the version of the data they were computed from, a
+changed catalog never serves stale entries; those simply age out. Both caches
+are bounded LRUs with an optional time to live, configured with
+``RESULT_CACHE_SIZE``, ``SINGER_CACHE_SIZE`` and ``CACHE_TTL_SECONDS``.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 2048))
+SINGER_CACHE_SIZE = int(os.environ.get('SINGER_CACHE_SIZE', 8192))
+# Entries never expire unless a TTL is set, e.g. CACHE_TTL_SECONDS=3600
+CACHE_TTL_SECONDS = float(os.environ['CACHE_TTL_SECONDS']) if os.environ.get('CACHE_TTL_SECONDS') else None
+
+_MISSING = object()
+
+
+def normalize_input(user_input):
+    """Fold inputs that always get the same recommendations into one cache key
+
+    Singer matching and TF-IDF tokenization both lowercase the input and
+    ignore surrounding whitespace, so neither changes the result.
+    """
+    return str(user_input).strip().lower()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an entry limit, optional TTL and hit/miss counters"""
+
+    def __init__(self, max_entries, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for a key, or ``default``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[1] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, factory):
+        """Return the cached value for a key, computing and storing it on a miss
+
+        ``factory`` runs outside the lock, so concurrent misses for one key may
+        each compute it; ``None`` results are cached like any other value.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+result_cache = LRUCache(RESULT_CACHE_SIZE, CACHE_TTL_SECONDS)
+singer_cache = LRUCache(SINGER_CACHE_SIZE, CACHE_TTL_SECONDS)
@@ -0,0 +1,110 @@
+"""Artist and genre row lookups built once per catalog.
+
+Recommendations used to scan the whole catalog several times per query:
+lowercasing every artist name to find the singer's songs (twice), masking the
+genre column, and listing every genre to validate the filter. ``RowIndex``
+answers each of those with a dictionary lookup and an array slice.
+
+Rows are grouped by normalized artist name and, within an artist, by genre, so
+an (artist, genre) pair is a contiguous slice. Positions are dataframe row
+positions (for ``df.iloc``) in catalog order.
+"""
+import numpy as np
+import pandas as pd
+
+from recommendation_index import artist_key
+
+
+def _artist_keys(df):
+    return df['artist_name'].astype(str).str.lower()
+
+
+class RowIndex:
+    """Normalized artist -> rows, (artist, genre) -> rows and per-artist genre counts"""
+
+    def __init__(self, artist_keys, genre_names, artist_order, pair_order, genre_counts):
+        self._artist_keys = list(artist_keys)
+        self._genre_names = list(genre_names)
+        self._artists = {key: i for i, key in enumerate(self._artist_keys)}
+        self._genre_lookup = {genre: i for i, genre in enumerate(self._genre_names)}
+        self.genres = sorted(self._genre_names)
+
+        self._artist_order = artist_order
+        self._pair_order = pair_order
+        self._genre_counts = genre_counts
+        self._artist_offsets = np.concatenate([[0], np.cumsum(genre_counts.sum(axis=1))])
+        # Start of each (artist, genre) slice inside the artist's slice
+        self._genre_offsets = np.cumsum(genre_counts, axis=1) - genre_counts
+
+    @classmethod
+    def build(cls, df):
+        """Group a catalog's rows by artist and genre"""
+        artist_codes, artists = pd.factorize(_artist_keys(df), sort=True)
+        genre_codes, genres = pd.factorize(df['genre'], sort=True)
+
+        # Stable sorts keep rows in catalog order inside each group
+        artist_order = np.argsort(artist_codes, kind='stable')
+        pair_order = np.lexsort((genre_codes, artist_codes))
+        counts = np.zeros((len(artists), len(genres)), dtype=np.int64)
+        np.add.at(counts, (artist_codes, genre_codes), 1)
+        return cls(artists, [str(genre) for genre in genres], artist_order, pair_order, counts)
+
+    def extended(self, df, start):
+        """Index for ``df``, whose rows from ``start`` on were appended to this index's catalog
+
+        Existing groups are not rebuilt: the new rows are inserted at the end
+        of their artist and (artist, genre) slices, and new artists and genres
+        are added after the existing ones.
+        """
+        new_rows = df.iloc[start:]
+        artist_keys = list(self._artist_keys)
+        genre_names = list(self._genre_names)
+        artists = dict(self._artists)
+        genre_lookup = dict(self._genre_lookup)
+        artist_codes = np.array([artists.setdefault(key, len(artists)) for key in _artist_keys(new_rows)],
+                                dtype=np.int64)
+        genre_codes = np.array([genre_lookup.setdefault(str(genre), len(genre_lookup))
+                                for genre in new_rows['genre']], dtype=np.int64)
+        artist_keys.extend(list(artists)[len(artist_keys):])
+        genre_names.extend(list(genre_lookup)[len(genre_names):])
+
+        counts = np.zeros((len(artist_keys), len(genre_names)), dtype=np.int64)
+        counts[:self._genre_counts.shape[0], :self._genre_counts.shape[1]] = self._genre_counts
+        artist_ends = np.append(self._artist_offsets[1:], np.full(len(artist_keys) - len(self._artist_keys),
+                                                                  self._artist_offsets[-1]))
+        pair_ends = (artist_ends - counts.sum(axis=1))[:, None] + np.cumsum(counts, axis=1)
+        positions = np.arange(start, len(df))
+        # Insert at the old slice ends, grouped like the existing rows, so every group stays in catalog order
+        order = np.argsort(artist_codes, kind='stable')
+        artist_order = np.insert(self._artist_order, artist_ends[artist_codes[order]], positions[order])
+        order = np.lexsort((genre_codes, artist_codes))
+        pair_order = np.insert(self._pair_order, pair_ends[artist_codes[order], genre_codes[order]],
+                               positions[order])
+        np.add.at(counts, (artist_codes, genre_codes), 1)
+        return RowIndex(artist_keys, genre_names, artist_order, pair_order, counts)
+
+    def artist_rows(self, artist):
+        """Positions of an artist's songs, in catalog order"""
+        position = self._artists.get(artist_key(artist))
+        if position is None:
+            return np.array([], dtype=np.int64)
+        start, stop = self._artist_offsets[position], self._artist_offsets[position + 1]
+        return self._artist_order[start:stop]
+
+    def artist_genre_rows(self, artist, genre):
+        """Positions of an artist's songs in one genre, in catalog order"""
+        position = self._artists.get(artist_key(artist))
+        genre_position = self._genre_lookup.get(genre)
+        if position is None or genre_position is None:
+            return np.array([], dtype=np.int64)
+        start = self._artist_offsets[position] + self._genre_offsets[position, genre_position]
+        return self._pair_order[start:start + self._genre_counts[position, genre_position]]
+
+    def genre_counts(self, artist):
+        """Song count per genre for an artist, most common first"""
+        position = self._artists.get(artist_key(artist))
+        if position is None:
+            return {}
+        counts = self._genre_counts[position]
+        present = sorted(np.flatnonzero(counts), key=lambda i: (-counts[i], self._genre_names[i]))
+        return {self._genre_names[i]: int(counts[i]) for i in present}
@@ -0,0 +1,50 @@
+"""Client for a running recommendation service (see ``recommendation_service``).
+
+Kept apart from the service, which imports the catalog and its indexes, so
+that the app can talk to a service, and render its first page, without loading
+pandas or scikit-learn. ``recommender`` is only imported to build the first
+result.
+"""
+import json
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+DEFAULT_RECOMMENDATIONS = 10
+MAX_RECOMMENDATIONS = 100
+CLIENT_TIMEOUT = 10
+
+
+class RecommendationClient:
+    """Client for a running recommendation service"""
+
+    def __init__(self, base_url, timeout=CLIENT_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = Request(self.base_url + path, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            # Validation errors carry a JSON message
+            message = json.loads(e.read() or b'{}').get('error') or str(e)
+            raise ValueError(message) from None
+
+    def recommend(self, singer, num_recommendations=DEFAULT_RECOMMENDATIONS, genre_filter=None):
+        """Recommendations as a ``Recommendation``, like ``get_recommendations``"""
+        from recommender import Recommendation
+
+        return Recommendation.from_dict(self._request('/recommendations', {
+            'singer': singer, 'n': num_recommendations, 'genre': genre_filter,
+        }))
+
+    def summary(self):
+        return self._request('/catalog')
+
+    def health(self):
+        return self._request('/health')
+
+    def metrics(self):
+        return self._request('/metrics')
@@ -0,0 +1,221 @@
+"""Cross-artist scoring spread over a pool of worker processes.
+
+Per-singer recommendations only score one artist's rows, but cross-artist
+queries (songs matching a text by any artist, artists similar to an artist)
+score the whole catalog. ``ShardedScorer`` splits the artist-grouped rows of
+a ``RecommendationIndex`` into shards of whole artists with about the same
+number of rows each, and scores the shards in parallel.
+
+The global TF-IDF matrix is written once as plain ``.npy`` files to a scratch
+directory that every worker memory-maps, so the processes share a single
+page-cache copy instead of each unpickling its own. Only query vectors and
+each shard's best candidates cross process boundaries.
+
+Every shard returns its top candidates and the parent merges them by score,
+breaking ties by matrix row (or artist) order. Shards are contiguous in that
+order, so results do not depend on the number of shards or workers or on
+which shard finishes first, and equal scoring the whole matrix at once.
+
+Scores use the catalog-wide ``global`` weights: a per-singer fit does not
+apply when every artist is scored.
+
+Worker processes only pay off with spare cores: on a single CPU, two workers
+score slower than one shard in process (see
+``benchmarks/bench_sharded_scoring.py``), so ``SCORING_WORKERS`` defaults to
+the CPU count.
+
+    python sharded_scoring.py songs.csv --query "tum hi ho" -n 20 --workers 8
+    python sharded_scoring.py catalog_bundle/ --similar-to "Arijit Singh" -n 10
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from catalog import open_catalog
+from ranking import top_k, top_k_sparse
+from recommender import display_songs
+
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', os.cpu_count() or 1))
+# More shards than workers evens out shards that hold one very large artist
+SHARDS_PER_WORKER = 2
+MATRIX_FILES = ('data', 'indices', 'indptr')
+
+Shard = namedtuple('Shard', ['first_artist', 'stop_artist', 'start', 'stop'])
+
+_worker_matrix = None
+
+
+def plan_shards(artist_offsets, count):
+    """Split artist-grouped rows into at most ``count`` shards of whole artists
+
+    Shard boundaries are the artist boundaries closest to even row counts;
+    an artist is never split, so a very large artist gets a large shard.
+    """
+    artist_offsets = np.asarray(artist_offsets, dtype=np.int64)
+    targets = np.linspace(0, artist_offsets[-1], max(1, count) + 1)
+    bounds = np.unique(np.searchsorted(artist_offsets, targets))
+    return [Shard(int(first), int(stop), int(artist_offsets[first]), int(artist_offsets[stop]))
+            for first, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def _shard_rows(matrix, shard):
+    """A shard's rows of a ``(data, indices, indptr, columns)`` CSR matrix, sharing its arrays"""
+    data, indices, indptr, columns = matrix
+    begin, end = indptr[shard.start], indptr[shard.stop]
+    return sparse.csr_matrix((data[begin:end], indices[begin:end], indptr[shard.start:shard.stop + 1] - begin),
+                             shape=(shard.stop - shard.start, columns), copy=False)
+
+
+def _top_songs(matrix, shard, vectors, k):
+    """Each query's ``k`` best rows of one shard, as (matrix rows, scores)"""
+    # Rows and queries are L2-normalized, so dot products are cosine similarities
+    similarity = (vectors @ _shard_rows(matrix, shard).T).tocsr()
+    results = []
+    for i in range(similarity.shape[0]):
+        row = similarity[i]
+        top = top_k_sparse(row, k)
+        results.append((top + shard.start, row[:, top].toarray().ravel()))
+    return results
+
+
+def _top_artists(matrix, shard, artist_offsets, vector, k):
+    """The ``k`` artists of one shard whose songs are on average most similar to ``vector``"""
+    similarity = (_shard_rows(matrix, shard) @ vector.T).toarray().ravel()
+    starts = artist_offsets[:-1] - shard.start
+    means = np.add.reduceat(similarity, starts) / np.diff(artist_offsets)
+    top = top_k(means, k)
+    return top + shard.first_artist, means[top]
+
+
+def _merge(candidates, k):
+    """The ``k`` best of several (ids, scores) candidate lists, equal scores in id order"""
+    ids = np.concatenate([ids for ids, _ in candidates])
+    scores = np.concatenate([scores for _, scores in candidates])
+    order = np.lexsort((ids, -scores))[:k]
+    return ids[order], scores[order]
+
+
+def _init_worker(directory, columns):
+    global _worker_matrix
+    arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in MATRIX_FILES]
+    _worker_matrix = (*arrays, columns)
+
+
+def _run_in_worker(task):
+    func, args = task
+    return func(_worker_matrix, *args)
+
+
+class ShardedScorer:
+    """Cross-artist scoring of a ``RecommendationIndex``, one task per artist shard
+
+    With one worker the shards are scored in this process. Otherwise call
+    ``close`` (or use the scorer as a context manager) to stop the workers
+    and delete the memory-mapped matrix files.
+    """
+
+    def __init__(self, index, workers=SCORING_WORKERS, shards=None):
+        self.index = index
+        self.workers = max(1, workers)
+        matrix = index.global_matrix()
+        self._matrix = (matrix.data, matrix.indices, matrix.indptr, matrix.shape[1])
+        self.shards = plan_shards(index.artist_offsets, shards or self.workers * SHARDS_PER_WORKER)
+        self._directory = None
+        self._pool = None
+        if self.workers > 1 and len(self.shards) > 1:
+            self._directory = tempfile.mkdtemp(prefix='scoring-shards-')
+            for name, array in zip(MATRIX_FILES, self._matrix):
+                np.save(os.path.join(self._directory, f"{name}.npy"), array)
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self._directory, matrix.shape[1]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def _map(self, func, tasks):
+        if self._pool is None:
+            return [func(self._matrix, *args) for args in tasks]
+        return list(self._pool.map(_run_in_worker, [(func, args) for args in tasks]))
+
+    def search(self, queries, k=10):
+        """The ``k`` best songs of the whole catalog for each query text
+
+        Returns one ``(dataframe positions, scores)`` pair per query, best first.
+        """
+        queries = list(queries)
+        if not queries or not self.shards:
+            return [(np.array([], dtype=np.int64), np.array([]))] * len(queries)
+        vectors = self.index.global_vectors(queries)
+        per_shard = self._map(_top_songs, [(shard, vectors, k) for shard in self.shards])
+        results = []
+        for i in range(len(queries)):
+            rows, scores = _merge([candidates[i] for candidates in per_shard], k)
+            results.append((self.index.row_order[rows], scores))
+        return results
+
+    def similar_artists(self, artist, k=10):
+        """Artist keys whose songs are on average most similar to an artist's songs
+
+        The artist is represented by the mean of its TF-IDF rows. Returns a list
+        of ``(artist key, score)`` pairs, best first, without the artist itself.
+        """
+        start, stop = self.index.artist_slice(artist)
+        if start == stop:
+            return []
+        position = int(np.searchsorted(self.index.artist_offsets, start))
+        vector = sparse.csr_matrix(self.index.global_matrix()[start:stop].mean(axis=0))
+        tasks = [(shard, self.index.artist_offsets[shard.first_artist:shard.stop_artist + 1], vector, k + 1)
+                 for shard in self.shards]
+        positions, scores = _merge(self._map(_top_artists, tasks), k + 1)
+        return [(self.index.artist_keys[p], float(score)) for p, score in zip(positions, scores)
+                if p != position][:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score queries against every artist of a catalog')
+    parser.add_argument('catalog', help='CSV export or catalog bundle directory')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--query', action='append', help='search text; may be repeated')
+    target.add_argument('--similar-to', help='list the artists most similar to this singer')
+    parser.add_argument('-n', '--num-results', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=SCORING_WORKERS)
+    parser.add_argument('--shards', type=int, help=f'defaults to {SHARDS_PER_WORKER} per worker')
+    args = parser.parse_args()
+
+    catalog = open_catalog(args.catalog)
+    with ShardedScorer(catalog.index, args.workers, args.shards) as scorer:
+        if args.similar_to:
+            singer = catalog.artist_index.lookup(args.similar_to)
+            if not singer:
+                raise SystemExit(f"No close matches found for '{args.similar_to}'")
+            print(f"Artists similar to {singer}:")
+            for key, score in scorer.similar_artists(singer, args.num_results):
+                name = catalog.df['artist_name'].iloc[catalog.index.artist_rows(key)[0]]
+                print(f"{score:8.4f}  {name}")
+            return
+        for query, (positions, scores) in zip(args.query, scorer.search(args.query, args.num_results)):
+            songs = display_songs(catalog.df.iloc[positions])
+            songs['score'] = scores
+            print(f"\n{query}:")
+            print(songs.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
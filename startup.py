@@ -0,0 +1,70 @@
+"""Background warm-up and startup milestones for the Streamlit app.
+
+Streamlit re-executes the app script for every session and interaction, but
+imported modules, and so this module's state, live as long as the server
+process. The app only imports light modules at the top of its script, renders
+its page right away and loads the catalog, which imports pandas and
+scikit-learn and builds or loads the indexes, on a warm-up thread started by
+the first session. Later sessions get the same warm-up, finished or not.
+
+Milestones such as ``first_paint`` and ``first_recommendation`` are recorded
+once per process, as seconds since this module was imported, and ``report``
+returns them (see ``benchmarks/bench_startup.py``).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+STARTED = time.time()
+
+logger = logging.getLogger('recommender.startup')
+
+_lock = threading.Lock()
+_warmups = {}
+_milestones = {}
+
+
+def mark(name):
+    """Record a milestone the first time it is reached in this process"""
+    with _lock:
+        if name in _milestones:
+            return
+        _milestones[name] = time.time()
+    logger.info("startup milestone %s after %.3fs", name, _milestones[name] - STARTED)
+
+
+def report(since=None):
+    """Seconds from ``since`` (a ``time.time()`` value, by default the import of this module) to each milestone"""
+    since = STARTED if since is None else since
+    with _lock:
+        return {name: round(at - since, 4) for name, at in sorted(_milestones.items(), key=lambda item: item[1])}
+
+
+def _run(name, future, func):
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        result = func()
+    except BaseException as e:
+        # Let the next session retry instead of keeping the failure
+        with _lock:
+            _warmups.pop(name, None)
+        future.set_exception(e)
+    else:
+        mark(f"{name}_ready")
+        future.set_result(result)
+
+
+def warm_up(name, func):
+    """Run ``func`` on a background thread once per process
+
+    Returns a ``concurrent.futures.Future`` of its result; later calls with the
+    same name return the same future, unless the warm-up failed.
+    """
+    with _lock:
+        future = _warmups.get(name)
+        if future is None:
+            future = _warmups[name] = Future()
+            threading.Thread(target=_run, args=(name, future, func), name=f"warm-up-{name}", daemon=True).start()
+    return future
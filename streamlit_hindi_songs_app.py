@@ -1,11 +1,23 @@
 import streamlit as st
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from fuzzywuzzy import process
+import startup
+from catalog_cache import catalog_cache, content_hash
+import instrumentation
+from recommendation_executor import ExecutorBusy
+from service_client import MAX_RECOMMENDATIONS, RecommendationClient
 import warnings
 import base64
+import io
+import os
 warnings.filterwarnings("ignore")
+# pandas, scikit-learn and the catalog modules are imported on first use,
+# normally on the warm-up thread while the page renders (see startup.py)
+
+# Preprocessed catalog bundle served instead of the sample data (see catalog_store.py)
+CATALOG_BUNDLE = os.environ.get('CATALOG_BUNDLE')
+# Running recommendation service to query instead of loading a catalog (see recommendation_service.py)
+RECOMMENDATION_SERVICE_URL = os.environ.get('RECOMMENDATION_SERVICE_URL')
+# Songs rendered per page of results
+PAGE_SIZE = int(os.environ.get('RESULTS_PAGE_SIZE', 10))
 
 # Page configuration
 st.set_page_config(
@@ -226,6 +238,8 @@ def create_header():
 
 def load_sample_data():
     """Create sample data if no file is uploaded"""
+    import pandas as pd
+    
     sample_data = {
         'track_name': [
             'Tum Hi Ho', 'Jeene Laga Hoon', 'Raabta', 'Tera Ban Jaunga', 'Dil Diyan Gallan',
@@ -264,167 +278,65 @@ def load_sample_data():
     }
     return pd.DataFrame(sample_data)
 
-def preprocess_data(df):
-    """Preprocess the uploaded data"""
-    # Rename columns if they exist
-    column_mapping = {
-        'Track Name': 'track_name',
-        'Artist Name': 'artist_name',
-        'Track URI': 'spotify_link',
-        'Album': 'album',
-        'Duration (ms)': 'duration',
-        'Artist Genres': 'artist_genres'
-    }
-    
-    for old_col, new_col in column_mapping.items():
-        if old_col in df.columns:
-            df.rename(columns={old_col: new_col}, inplace=True)
-    
-    # Select relevant columns
-    required_columns = ['track_name', 'artist_name', 'spotify_link', 'album', 'duration', 'artist_genres']
-    available_columns = [col for col in required_columns if col in df.columns]
-    df = df[available_columns]
-    
-    # Remove duplicates
-    df = df.drop_duplicates(subset=['track_name', 'artist_name', 'album']).reset_index(drop=True)
-    
-    # Fill missing values
-    for col in df.columns:
-        if col in ['track_name', 'artist_name', 'album', 'artist_genres']:
-            df[col] = df[col].fillna("")
-    
-    # Process Spotify links
-    if 'spotify_link' in df.columns:
-        df['spotify_link'] = df['spotify_link'].apply(
-            lambda x: f"https://open.spotify.com/track/{x.split(':')[-1]}" 
-            if isinstance(x, str) and 'spotify:track:' in x else ""
-        )
+def load_catalog(csv_source=None):
+    """Ingest and index a catalog, or the sample data if no source is given"""
+    from catalog import build_catalog
+    from catalog_ingest import ingest_csv, preprocess_data
     
-    # Format duration
-    if 'duration' in df.columns:
-        df['formatted_duration'] = df['duration'].apply(
-            lambda x: f"{int(x // 60000)}:{int((x % 60000) / 1000):02d}" 
-            if pd.notnull(x) else "0:00"
-        )
+    if csv_source is None:
+        return build_catalog(preprocess_data(load_sample_data()))
     
-    return df
+    df, ingest_report = ingest_csv(csv_source)
+    return build_catalog(df, ingest_report)
 
-def infer_genre(row):
-    """Infer genre from artist genres and album name"""
-    genres = str(row.get('artist_genres', '')).lower()
-    album_name = str(row.get('album', '')).lower()
+def load_default_catalog():
+    """Load the configured catalog bundle, or the sample data"""
+    from catalog import open_catalog
+    from catalog_store import bundle_fingerprint
+    
+    if CATALOG_BUNDLE:
+        # Bundles are memory-mapped already, so only keep them in the memory tier
+        return catalog_cache.get_or_create(
+            content_hash(bundle_fingerprint(CATALOG_BUNDLE).encode()),
+            lambda: open_catalog(CATALOG_BUNDLE),
+            persist=False
+        )
+    return catalog_cache.get_or_create('sample', load_catalog)
 
-    if 'chutney' in genres:
-        return 'Chutney'
-    elif 'filmi' in genres or 'modern bollywood' in genres:
-        return 'Filmi'
-    elif any(word in genres for word in ['bhajan', 'ghazal', 'sufi', 'hare krishna']):
-        return 'Bhajan'
-    elif 'bhojpuri pop' in genres:
-        return 'Bhojpuri'
-    elif 'afghan pop' in genres:
-        return 'Afghan'
-    elif any(word in genres for word in ['classic bollywood', 'classic pakistani pop', 'classic punjabi pop']):
-        return 'Classic'
-    elif any(word in album_name for word in ['bhajan', 'devotional']):
-        return 'Bhajan'
-    elif 'bhojpuri' in album_name:
-        return 'Bhojpuri'
-    elif any(word in album_name for word in ['classic', 'retro']):
-        return 'Classic'
-    else:
-        return 'Filmi'
+def warm_up_catalog():
+    """Load the default catalog and run one query so the first recommendation finds everything loaded"""
+    catalog = load_default_catalog()
+    if catalog.artist_index.artists:
+        catalog.recommend(catalog.artist_index.artists[0], 1, use_cache=False)
+    return catalog
 
-def find_closest_singer(user_input, df):
-    """Find the closest matching singer using fuzzy matching"""
-    singers = df['artist_name'].unique().tolist()
-    singers = [singer for singer in singers if singer.strip()]  # Remove empty strings
-    
-    if not singers:
-        return None
-        
-    best_match = process.extractOne(user_input, singers, score_cutoff=60)
-    if best_match:
-        return best_match[0]
-    return None
+def preload_modules():
+    """Import the modules that turn service responses into frames"""
+    import recommender  # noqa: F401
 
-def get_singer_genres(singer, df):
-    """Get genres for a specific singer"""
-    if singer:
-        singer_songs = df[df['artist_name'].str.lower() == singer.lower()]
-        if not singer_songs.empty:
-            genre_counts = singer_songs['genre'].value_counts().to_dict()
-            return sorted(genre_counts.keys()), genre_counts
-    return [], {}
+def default_catalog():
+    """The default catalog, waiting for the warm-up thread if it is still loading
 
-def train_tfidf(df):
-    """Train TF-IDF vectorizer"""
-    tfidf = TfidfVectorizer(stop_words='english', max_features=1000)
-    combined_data = df['track_name'].fillna('') + ' ' + df['artist_name'].fillna('') + ' ' + df['album'].fillna('')
-    vectorizer = tfidf.fit_transform(combined_data)
-    return tfidf, vectorizer
+    The warm-up only primes the catalog cache: once it is done, every rerun
+    calls ``load_default_catalog`` again, so a newly published bundle snapshot
+    changes the fingerprint and is picked up.
+    """
+    future = startup.warm_up('catalog', warm_up_catalog)
+    if not future.done():
+        with st.spinner("🔄 Loading the song catalog..."):
+            future.result()
+    # Raises the warm-up's error, if any; the next rerun retries it
+    future.result()
+    return load_default_catalog()
 
-def get_recommendations(user_input, df, num_recommendations=10, genre_filter=None):
-    """Get song recommendations based on singer and optional genre filter"""
-    matched_singer = find_closest_singer(user_input, df)
-    
-    if not matched_singer:
-        return pd.DataFrame(), "No close matches found for the singer. Please check your input."
-    
-    singer_genres, genre_counts = get_singer_genres(matched_singer, df)
-    
-    if not singer_genres:
-        return pd.DataFrame(), f"No genres found for singer '{matched_singer}'."
-    
-    unique_genres = sorted(df['genre'].unique().tolist())
-    
-    if genre_filter and genre_filter not in unique_genres:
-        return pd.DataFrame(), f"Invalid genre '{genre_filter}'. Available genres: {', '.join(unique_genres)}"
-    
-    if genre_filter and genre_filter not in singer_genres:
-        return pd.DataFrame(), f"Genre '{genre_filter}' not associated with '{matched_singer}'. Singer's genres: {', '.join(singer_genres)}"
-    
-    # Filter songs by singer
-    df_filtered = df[df['artist_name'].str.lower() == matched_singer.lower()]
-    
-    if df_filtered.empty:
-        return pd.DataFrame(), f"No songs found for '{matched_singer}'."
-    
-    # Apply genre filter if specified
-    if genre_filter:
-        df_filtered = df_filtered[df_filtered['genre'] == genre_filter]
-        if df_filtered.empty:
-            return pd.DataFrame(), f"No songs found for '{matched_singer}' in genre '{genre_filter}'."
-    
-    # Train TF-IDF and get recommendations
-    tfidf, vectorizer = train_tfidf(df_filtered)
-    combined_query = f"{matched_singer} {user_input}"
-    user_vector = tfidf.transform([combined_query])
-    user_similarity = cosine_similarity(user_vector, vectorizer)
-    
-    # Get top recommendations
-    similar_indices = user_similarity.argsort()[0][-num_recommendations:][::-1]
-    recommendations = df_filtered.iloc[similar_indices]
-    
-    # Select columns for display
-    display_columns = ['track_name', 'artist_name', 'album', 'genre']
-    if 'formatted_duration' in recommendations.columns:
-        display_columns.append('formatted_duration')
-    if 'spotify_link' in recommendations.columns:
-        display_columns.append('spotify_link')
-        
-    recommendations = recommendations[display_columns]
-    
-    return recommendations, None, matched_singer, genre_counts
-
-def display_stats(df):
+def display_stats(summary):
     """Display dataset statistics"""
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.markdown(f"""
         <div class="stats-card">
-            <p class="stats-number">{len(df)}</p>
+            <p class="stats-number">{summary['songs']}</p>
             <p class="stats-label">Total Songs</p>
         </div>
         """, unsafe_allow_html=True)
@@ -432,7 +344,7 @@ def display_stats(df):
     with col2:
         st.markdown(f"""
         <div class="stats-card">
-            <p class="stats-number">{df['artist_name'].nunique()}</p>
+            <p class="stats-number">{summary['artists']}</p>
             <p class="stats-label">Artists</p>
         </div>
         """, unsafe_allow_html=True)
@@ -440,21 +352,114 @@ def display_stats(df):
     with col3:
         st.markdown(f"""
         <div class="stats-card">
-            <p class="stats-number">{df['genre'].nunique()}</p>
+            <p class="stats-number">{len(summary['genres'])}</p>
             <p class="stats-label">Genres</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col4:
-        if 'album' in df.columns:
+        if summary['albums'] is not None:
             st.markdown(f"""
             <div class="stats-card">
-                <p class="stats-number">{df['album'].nunique()}</p>
+                <p class="stats-number">{summary['albums']}</p>
                 <p class="stats-label">Albums</p>
             </div>
             """, unsafe_allow_html=True)
 
+def display_similar_songs(recommendations, similar_songs, num_similar=3):
+    """List the nearest songs to each recommendation from the catalog's neighbour graph"""
+    lines = []
+    for position, track in zip(recommendations.index, recommendations['track_name']):
+        songs = similar_songs(position, num_similar)
+        if songs is None:
+            # No graph has been built for this catalog (see neighbor_graph.py)
+            return
+        if not songs.empty:
+            similar = ', '.join(f"{name} ({artist})" for name, artist in zip(songs['track_name'], songs['artist_name']))
+            lines.append(f"- **{track}** → {similar}")
+    if lines:
+        with st.expander("🔗 Songs like these"):
+            st.markdown('\n'.join(lines))
+
+def render_page(songs):
+    """HTML table of one page of songs, with clickable Spotify links"""
+    if 'spotify_link' in songs.columns:
+        songs = songs.assign(spotify_link=[f'<a href="{link}" target="_blank">🎧 Listen</a>' if link else ''
+                                           for link in songs['spotify_link']])
+    return songs.to_html(escape=False, index=False)
+
+def turn_page(step):
+    st.session_state['results']['page'] += step
+
+def display_results(results, similar_songs):
+    """Show the last search result, rendering only the current page of songs"""
+    recommendations, error, matched_singer, genre_counts = results['result']
+    if error:
+        st.error(f"❌ {error}")
+        return
+    
+    # Display matched singer and genres
+    st.markdown('<div class="custom-card">', unsafe_allow_html=True)
+    st.markdown(f"### 🎤 Recommendations for: **{matched_singer}**")
+    
+    if genre_counts:
+        st.markdown("**Available Genres:**")
+        genre_html = ""
+        for genre, count in sorted(genre_counts.items()):
+            genre_html += f'<span class="genre-badge">{genre} ({count})</span>'
+        st.markdown(genre_html, unsafe_allow_html=True)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Display recommendations
+    st.markdown('<div class="custom-card">', unsafe_allow_html=True)
+    st.markdown("### 🎵 Recommended Songs")
+    
+    if recommendations.empty:
+        st.warning("⚠️ No recommendations found. Try a different singer or genre.")
+        st.markdown('</div>', unsafe_allow_html=True)
+        return
+    
+    page_count = -(-len(recommendations) // PAGE_SIZE)
+    page = min(results['page'], page_count - 1)
+    start, stop = page * PAGE_SIZE, min((page + 1) * PAGE_SIZE, len(recommendations))
+    
+    # Each page is rendered once per search and reused on later reruns
+    html = results['pages'].get(page)
+    if html is None:
+        with instrumentation.stage('render_html'):
+            html = results['pages'][page] = render_page(recommendations.iloc[start:stop])
+    st.write(html, unsafe_allow_html=True)
+    
+    if page_count > 1:
+        col_previous, col_position, col_next = st.columns([1, 2, 1])
+        with col_previous:
+            st.button("⬅️ Previous", on_click=turn_page, args=(-1,), disabled=page == 0, key='previous_page')
+        with col_position:
+            st.caption(f"Songs {start + 1}–{stop} of {len(recommendations)}")
+        with col_next:
+            st.button("Next ➡️", on_click=turn_page, args=(1,), disabled=page == page_count - 1, key='next_page')
+    
+    # The CSV is only built when the button is clicked
+    st.download_button(
+        label="📥 Download Recommendations",
+        data=lambda: recommendations.to_csv(index=False),
+        file_name=f"recommendations_{matched_singer}_{results['genre_filter'] or 'all_genres'}.csv",
+        mime="text/csv"
+    )
+    
+    if similar_songs is not None:
+        display_similar_songs(recommendations.iloc[start:stop], similar_songs)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
 def main():
+    # Load what the first recommendation needs while the page renders
+    if RECOMMENDATION_SERVICE_URL:
+        startup.warm_up('modules', preload_modules)
+    else:
+        startup.warm_up('catalog', warm_up_catalog)
+    
     load_css()
     create_header()
     
@@ -468,7 +473,7 @@ def main():
         )
         
         st.markdown("### ⚙️ Settings")
-        num_recommendations = st.slider("Number of recommendations", 5, 20, 10)
+        num_recommendations = st.slider("Number of recommendations", 5, MAX_RECOMMENDATIONS, 10)
         
         st.markdown("### 📊 About")
         st.markdown("""
@@ -479,28 +484,11 @@ def main():
         - **Cosine similarity**
         """)
     
-    # Load data
-    if uploaded_file is not None:
-        try:
-            df = pd.read_csv(uploaded_file)
-            df = preprocess_data(df)
-            st.success("✅ File uploaded successfully!")
-        except Exception as e:
-            st.error(f"❌ Error loading file: {str(e)}")
-            df = load_sample_data()
-            st.info("📝 Using sample data instead.")
-    else:
-        df = load_sample_data()
-        st.info("📝 Using sample data. Upload your own CSV file for personalized recommendations.")
+    startup.mark('first_paint')
     
-    # Add genre column
-    df['genre'] = df.apply(infer_genre, axis=1)
-    
-    # Display dataset statistics
-    st.markdown('<div class="custom-card">', unsafe_allow_html=True)
-    st.markdown("### 📊 Dataset Overview")
-    display_stats(df)
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Dataset overview, filled in once the catalog is loaded, so the search form
+    # below renders and takes input while the warm-up thread is still loading
+    overview = st.container()
     
     # Main recommendation interface
     st.markdown('<div class="custom-card">', unsafe_allow_html=True)
@@ -516,7 +504,68 @@ def main():
         )
     
     with col2:
-        unique_genres = ['All'] + sorted(df['genre'].unique().tolist())
+        # Filled in once the catalog is loaded
+        genre_area = st.container()
+    
+    # Search button
+    col_center = st.columns([1, 2, 1])[1]
+    with col_center:
+        search_button = st.button("🔍 Get Recommendations", use_container_width=True)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    startup.mark('interactive')
+    
+    with overview:
+        # Load data, reusing the parsed catalog across reruns for the same file contents
+        catalog = None
+        if uploaded_file is not None:
+            try:
+                data = uploaded_file.getvalue()
+                catalog = catalog_cache.get_or_create(
+                    content_hash(data), lambda: load_catalog(io.BytesIO(data))
+                )
+                st.success("✅ File uploaded successfully!")
+                report = catalog.ingest_report
+                if report:
+                    peak = f", peak memory {report['peak_rss_mb']:.0f} MB" if report['peak_rss_mb'] else ""
+                    st.caption(f"Ingested {report['rows_kept']} songs ({report['duplicates']} duplicates dropped) "
+                               f"in {report['seconds']:.1f}s{peak}")
+            except Exception as e:
+                st.error(f"❌ Error loading file: {str(e)}")
+                catalog = default_catalog()
+                st.info("📝 Using the preloaded catalog instead." if CATALOG_BUNDLE else "📝 Using sample data instead.")
+        elif RECOMMENDATION_SERVICE_URL:
+            # Thin client: the service holds the catalog and computes recommendations
+            client = RecommendationClient(RECOMMENDATION_SERVICE_URL)
+            try:
+                summary = client.summary()
+                recommend = client.recommend
+                st.info("📝 Using the recommendation service. Upload your own CSV file for personalized recommendations.")
+            except OSError as e:
+                st.error(f"❌ Recommendation service unavailable: {str(e)}")
+                catalog = default_catalog()
+        else:
+            catalog = default_catalog()
+            if CATALOG_BUNDLE:
+                st.info("📝 Using the preloaded catalog. Upload your own CSV file for personalized recommendations.")
+            else:
+                st.info("📝 Using sample data. Upload your own CSV file for personalized recommendations.")
+        
+        similar_songs = None
+        if catalog is not None:
+            summary = catalog.summary()
+            # Shared with other sessions, so concurrent identical searches are computed once
+            recommend = catalog.recommend_shared
+            similar_songs = catalog.similar_songs
+        
+        # Display dataset statistics
+        st.markdown('<div class="custom-card">', unsafe_allow_html=True)
+        st.markdown("### 📊 Dataset Overview")
+        display_stats(summary)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with genre_area:
+        unique_genres = ['All'] + summary['genres']
         genre_filter = st.selectbox(
             "🎵 Genre (Optional):",
             unique_genres,
@@ -526,65 +575,30 @@ def main():
         if genre_filter == 'All':
             genre_filter = None
     
-    # Search button
-    col_center = st.columns([1, 2, 1])[1]
-    with col_center:
-        search_button = st.button("🔍 Get Recommendations", use_container_width=True)
-    
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Process recommendations
+    # Process recommendations, keeping the result across reruns for paging
+    source = catalog.version if catalog is not None else RECOMMENDATION_SERVICE_URL
     if search_button and singer_input:
         with st.spinner("🔄 Finding perfect songs for you..."):
-            recommendations, error, matched_singer, genre_counts = get_recommendations(
-                singer_input, df, num_recommendations, genre_filter
-            )
-            
-            if error:
-                st.error(f"❌ {error}")
-            else:
-                # Display matched singer and genres
-                st.markdown('<div class="custom-card">', unsafe_allow_html=True)
-                st.markdown(f"### 🎤 Recommendations for: **{matched_singer}**")
-                
-                if genre_counts:
-                    st.markdown("**Available Genres:**")
-                    genre_html = ""
-                    for genre, count in sorted(genre_counts.items()):
-                        genre_html += f'<span class="genre-badge">{genre} ({count})</span>'
-                    st.markdown(genre_html, unsafe_allow_html=True)
-                
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-                # Display recommendations
-                st.markdown('<div class="custom-card">', unsafe_allow_html=True)
-                st.markdown("### 🎵 Recommended Songs")
-                
-                if not recommendations.empty:
-                    # Make Spotify links clickable if they exist
-                    if 'spotify_link' in recommendations.columns:
-                        recommendations['spotify_link'] = recommendations['spotify_link'].apply(
-                            lambda x: f'<a href="{x}" target="_blank">🎧 Listen</a>' if x else ''
-                        )
-                    
-                    st.write(recommendations.to_html(escape=False, index=False), unsafe_allow_html=True)
-                    
-                    # Download button for recommendations
-                    csv = recommendations.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download Recommendations",
-                        data=csv,
-                        file_name=f"recommendations_{matched_singer}_{genre_filter or 'all_genres'}.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.warning("⚠️ No recommendations found. Try a different singer or genre.")
-                
-                st.markdown('</div>', unsafe_allow_html=True)
-    
+            try:
+                result = recommend(singer_input, num_recommendations, genre_filter)
+            except (OSError, ValueError, ExecutorBusy) as e:
+                result = (None, str(e), None, {})
+        startup.mark('first_recommendation')
+        st.session_state['results'] = {
+            'source': source, 'result': result, 'genre_filter': genre_filter, 'page': 0, 'pages': {}
+        }
     elif search_button and not singer_input:
         st.warning("⚠️ Please enter a singer's name to get recommendations.")
     
+    results = st.session_state.get('results')
+    if results is not None and results['source'] == source:
+        display_results(results, similar_songs)
+        
+        # Stage timings and startup milestones, with RECOMMENDER_INSTRUMENTATION=1
+        if instrumentation.ENABLED:
+            with st.expander("⏱️ Stage timings"):
+                st.json({**instrumentation.snapshot(), 'startup': startup.report()})
+    
     # Footer
     st.markdown("---")
     st.markdown("""
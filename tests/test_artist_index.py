@@ -0,0 +1,38 @@
+"""Indexed artist lookups resolve queries to the same singer as a full ``extractOne`` scan."""
+import pytest
+from fuzzywuzzy import process
+
+from artist_index import SCORE_CUTOFF, ArtistIndex
+from synthetic_catalog import make_artists, make_partial_queries, make_queries
+
+
+@pytest.fixture(scope='module')
+def artists():
+    return make_artists(3000, seed=4)
+
+
+def full_scan(query, artists):
+    match = process.extractOne(query, artists, score_cutoff=SCORE_CUTOFF)
+    return match[0] if match else None
+
+
+@pytest.mark.parametrize('make', [make_queries, make_partial_queries], ids=['names', 'partial'])
+def test_lookup_matches_full_scan(artists, make):
+    index = ArtistIndex(artists, scorer='fuzzywuzzy')
+    queries = make(artists, 45)
+    assert [index.lookup(query) for query in queries] == [full_scan(query, artists) for query in queries]
+
+
+def test_candidates_keep_ties_at_the_cutoff(artists):
+    index = ArtistIndex(artists, scorer='fuzzywuzzy', max_candidates=1)
+    word = artists[0].split()[0]
+    containing = [i for i, name in enumerate(index.normalized) if word.lower() in name]
+    # Every artist containing the word shares all of its trigrams, so none is cut
+    assert set(containing) <= set(index.candidates(word.lower()).tolist())
+
+
+def test_lookup_of_missing_and_empty_queries(artists):
+    index = ArtistIndex(artists)
+    assert index.lookup('') is None
+    assert index.lookup('?!') is None
+    assert index.lookup(artists[5].upper()) == artists[5]
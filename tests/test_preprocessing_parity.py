@@ -0,0 +1,140 @@
+"""The vectorized preprocessing shows the same songs as the original app.
+
+``baseline_preprocess_data`` is the app's ``preprocess_data`` before ingestion
+was vectorized: it kept full ``spotify_link`` URLs and a ``formatted_duration``
+column in the catalog. Today's catalogs keep bare track IDs and milliseconds,
+and ``display_songs`` formats them for the rows that are shown, so the two are
+compared on what the user sees.
+
+The one intended difference: a ``spotify:track:`` URI with an empty track ID
+used to become a link to the bare ``/track/`` page, and now shows no link.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog_ingest import ingest_csv, preprocess_data
+from recommender import SPOTIFY_TRACK_URL, display_songs
+from synthetic_catalog import make_catalog
+
+DISPLAYED = ['track_name', 'artist_name', 'album', 'genre', 'formatted_duration', 'spotify_link']
+EDGE_URIS = [np.nan, '', 'spotify:album:4aawyAB9vmqN3uQ7FjRGTy', 'https://open.spotify.com/track/abc',
+             'spotify:track:', 'spotify:track:a:b', 'spotify:local:x:spotify:track:y', 'SPOTIFY:TRACK:abc',
+             'spotify:track:line\nbreak:id', 'prefix spotify:track:xyz', 'spotify:track:ünïcödé']
+
+
+def baseline_preprocess_data(df):
+    """``preprocess_data`` as the app shipped it before vectorization"""
+    # Rename columns if they exist
+    column_mapping = {
+        'Track Name': 'track_name',
+        'Artist Name': 'artist_name',
+        'Track URI': 'spotify_link',
+        'Album': 'album',
+        'Duration (ms)': 'duration',
+        'Artist Genres': 'artist_genres'
+    }
+
+    for old_col, new_col in column_mapping.items():
+        if old_col in df.columns:
+            df.rename(columns={old_col: new_col}, inplace=True)
+
+    # Select relevant columns
+    required_columns = ['track_name', 'artist_name', 'spotify_link', 'album', 'duration', 'artist_genres']
+    available_columns = [col for col in required_columns if col in df.columns]
+    df = df[available_columns]
+
+    # Remove duplicates
+    df = df.drop_duplicates(subset=['track_name', 'artist_name', 'album']).reset_index(drop=True)
+
+    # Fill missing values
+    for col in df.columns:
+        if col in ['track_name', 'artist_name', 'album', 'artist_genres']:
+            df[col] = df[col].fillna("")
+
+    # Process Spotify links
+    if 'spotify_link' in df.columns:
+        df['spotify_link'] = df['spotify_link'].apply(
+            lambda x: f"https://open.spotify.com/track/{x.split(':')[-1]}"
+            if isinstance(x, str) and 'spotify:track:' in x else ""
+        )
+
+    # Format duration
+    if 'duration' in df.columns:
+        df['formatted_duration'] = df['duration'].apply(
+            lambda x: f"{int(x // 60000)}:{int((x % 60000) / 1000):02d}"
+            if pd.notnull(x) else "0:00"
+        )
+
+    return df
+
+
+def shown(df):
+    """The displayed columns of a frame as text, the way the results table renders them"""
+    df = df.assign(genre='')
+    return pd.DataFrame({col: df[col].astype(object).astype(str).tolist() for col in DISPLAYED if col in df.columns})
+
+
+def assert_same_display(raw, actual):
+    expected = shown(baseline_preprocess_data(raw.copy()))
+    if 'spotify_link' in expected.columns:
+        # Links without a track ID are no longer shown
+        expected['spotify_link'] = expected['spotify_link'].replace(SPOTIFY_TRACK_URL, '')
+    pd.testing.assert_frame_equal(shown(display_songs(actual.assign(genre=''))), expected)
+
+
+def with_edge_cases(raw, seed=0):
+    """A copy of a raw export with missing values and irregular URIs in every tenth row"""
+    rng = np.random.default_rng(seed)
+    raw = raw.copy()
+    rows = np.arange(0, len(raw), 10)
+    raw['Track URI'] = raw['Track URI'].astype(object)
+    raw.loc[rows, 'Track URI'] = rng.choice(np.array(EDGE_URIS, dtype=object), len(rows))
+    raw.loc[rows[::3], 'Album'] = np.nan
+    raw.loc[rows[1::3], 'Artist Genres'] = np.nan
+    raw['Duration (ms)'] = raw['Duration (ms)'].astype(float)
+    raw.loc[rows[2::3], 'Duration (ms)'] = np.nan
+    return raw
+
+
+def hand_written_frames():
+    yield 'object URIs', pd.DataFrame({'Track URI': pd.Series(EDGE_URIS + ['spotify:track:0123456789abcdefghijkl'],
+                                                               dtype=object),
+                                       'Track Name': 'x', 'Artist Name': 'y', 'Album': 'z'})
+    yield 'mixed URIs', pd.DataFrame({'Track URI': pd.Series([1, 2.5, b'spotify:track:x', None, 'spotify:track:a'],
+                                                             dtype=object),
+                                      'Track Name': list('abcde'), 'Artist Name': 'y', 'Album': 'z'})
+    yield 'no URIs', pd.DataFrame({'Track Name': ['a', None], 'Artist Name': ['b', 'b'], 'Album': ['c', None],
+                                   'Duration (ms)': [61_500.0, np.nan]})
+    yield 'duplicates', pd.DataFrame({'Track Name': ['a', 'a', 'a'], 'Artist Name': ['b', 'b', 'B'],
+                                      'Album': ['c', 'c', 'c'], 'Duration (ms)': [1000, 2000, 3000],
+                                      'Track URI': ['spotify:track:1', 'spotify:track:2', 'spotify:track:3']})
+
+
+@pytest.fixture(scope='module')
+def export():
+    return make_catalog(5000, seed=3)
+
+
+def test_synthetic_export(export):
+    assert_same_display(export, preprocess_data(export.copy()))
+
+
+def test_export_with_edge_cases(export):
+    raw = with_edge_cases(export)
+    assert_same_display(raw, preprocess_data(raw.copy()))
+    assert_same_display(raw.astype(object), preprocess_data(raw.astype(object)))
+
+
+@pytest.mark.parametrize('label,raw', list(hand_written_frames()), ids=lambda value: value if isinstance(value, str) else '')
+def test_hand_written_frames(label, raw):
+    assert_same_display(raw, preprocess_data(raw.copy()))
+
+
+def test_chunked_csv_ingestion(export):
+    text = with_edge_cases(export).to_csv(index=False)
+    df, report = ingest_csv(io.StringIO(text), chunksize=700)
+    assert report['chunks'] > 1
+    assert_same_display(pd.read_csv(io.StringIO(text)), df)
@@ -0,0 +1,65 @@
+"""Sharded cross-artist scoring returns exactly what scoring the whole matrix returns."""
+import numpy as np
+import pytest
+
+from catalog_ingest import preprocess_data
+from ranking import top_k
+from recommendation_index import RecommendationIndex
+from sharded_scoring import ShardedScorer
+from synthetic_catalog import make_catalog
+
+K = 15
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    df = preprocess_data(make_catalog(6000, artists=150, seed=5))
+    index = RecommendationIndex.build(df)
+    queries = df['track_name'].sample(25, random_state=5).tolist() + ['dil', 'no such words', '']
+    return index, queries
+
+
+def unsharded_search(index, queries, k):
+    matrix = index.global_matrix()
+    results = []
+    for vector in index.global_vectors(queries):
+        scores = (matrix @ vector.T).toarray().ravel()
+        rows = top_k(scores, k)
+        results.append((index.row_order[rows], scores[rows]))
+    return results
+
+
+def unsharded_similar_artists(index, artist, k):
+    matrix = index.global_matrix()
+    start, stop = index.artist_slice(artist)
+    vector = matrix[start:stop].mean(axis=0)
+    similarity = np.asarray(matrix @ np.asarray(vector).ravel()).ravel()
+    means = np.add.reduceat(similarity, index.artist_offsets[:-1]) / np.diff(index.artist_offsets)
+    position = int(np.searchsorted(index.artist_offsets, start))
+    return [(index.artist_keys[p], float(means[p])) for p in top_k(means, k + 1) if p != position][:k]
+
+
+@pytest.mark.parametrize('workers,shards', [(1, 1), (1, 7), (2, None), (3, 16)])
+def test_search_matches_unsharded(catalog, workers, shards):
+    index, queries = catalog
+    expected = unsharded_search(index, queries, K)
+    with ShardedScorer(index, workers, shards) as scorer:
+        assert len(scorer.shards) > 1 or shards == 1
+        actual = scorer.search(queries, K)
+    assert len(actual) == len(expected)
+    for (rows, scores), (expected_rows, expected_scores) in zip(actual, expected):
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-12, atol=1e-15)
+
+
+@pytest.mark.parametrize('workers,shards', [(1, 1), (1, 7), (2, None)])
+def test_similar_artists_match_unsharded(catalog, workers, shards):
+    index, _ = catalog
+    artists = [index.artist_keys[0], index.artist_keys[len(index.artist_keys) // 2], index.artist_keys[-1]]
+    with ShardedScorer(index, workers, shards) as scorer:
+        for artist in artists:
+            actual = scorer.similar_artists(artist, K)
+            expected = unsharded_similar_artists(index, artist, K)
+            assert [key for key, _ in actual] == [key for key, _ in expected]
+            np.testing.assert_allclose([score for _, score in actual], [score for _, score in expected],
+                                       rtol=1e-12, atol=1e-15)